@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from fat import open_volume
+from fat.image import build_image, random_tree
+from reader import FileReader, MmapReader, PReadReader
+
+# Benchmarks over synthetic volumes, see `fat.image`. Every scenario is built deterministically so results are
+# comparable between runs and can be checked against a stored baseline.
+
+SCENARIOS = {
+    "fat12-floppy": dict(fat=12, total_sectors=2880, sectors_per_cluster=1, root_entries=224, depth=2, fanout=2,
+                         files=8, lfn_density=0.5, size=(0, 8192), fragmentation=0.2),
+    "fat16-wide": dict(fat=16, total_sectors=262144, sectors_per_cluster=8, root_entries=8192, depth=1, fanout=4,
+                       files=2000, lfn_density=0.8, size=(0, 16384), fragmentation=0.1),
+    "fat32-deep": dict(fat=32, total_sectors=1048576, sectors_per_cluster=8, root_entries=0, depth=4, fanout=3,
+                       files=40, lfn_density=0.5, size=(0, 65536), fragmentation=0.3),
+    "fat32-large": dict(fat=32, total_sectors=1048576, sectors_per_cluster=8, root_entries=0, depth=1, fanout=2,
+                        files=4, lfn_density=0.0, size=(16 << 20, 32 << 20), fragmentation=0.05),
+}
+
+READERS = {"file": FileReader, "pread": PReadReader, "mmap": MmapReader}
+RANDOM_READ_SIZE = 4096
+RANDOM_READS = 2000
+LOOKUPS = 1000
+
+
+def make_image(path, scenario, seed):
+    lo, hi = scenario["size"]
+    tree = random_tree(seed, scenario["depth"], scenario["fanout"], scenario["files"], scenario["lfn_density"],
+                       lambda r: r.randint(lo, hi))
+
+    data = build_image(scenario["fat"], tree, scenario["total_sectors"], scenario["sectors_per_cluster"],
+                       scenario["root_entries"], scenario["fragmentation"], seed)
+
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def timed(func, repeat):
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_scenario(path, reader_cls, repeat, seed):
+    rnd = Random(seed)
+    results = {}
+
+    with open(path, "rb") as f:
+        @contextmanager
+        def volume():
+            # A new reader for every run, closed right after it so memory mappings do not pile up
+            reader = reader_cls(f)
+
+            try:
+                yield open_volume(reader)
+            finally:
+                if hasattr(reader, "close"):
+                    reader.close()
+
+        def run(func):
+            def opened():
+                with volume() as v:
+                    return func(v)
+
+            return opened
+
+        def walk(v):
+            return [
+                ("{}/{}".format(root.rstrip("/"), entry.name), entry)
+                for root, _, entries in v.walk() for entry in entries
+            ]
+
+        results["open_us"] = timed(run(lambda v: v), repeat) * 1e6
+        results["list_ms"] = timed(run(lambda v: v.scandir("/")), repeat) * 1e3
+        results["walk_ms"] = timed(run(walk), repeat) * 1e3
+        files = run(walk)()
+        results["files"] = len(files)
+
+        paths = [rnd.choice(files)[0] for _ in range(LOOKUPS)]
+        results["lookup_us"] = timed(run(lambda v: list(map(v.lookup, paths))), repeat) / LOOKUPS * 1e6
+
+        name, largest = max(files, key=lambda item: item[1].size)
+
+        with volume() as v:
+            entry = v.lookup(name)
+            size = entry.size
+            results["seq_mb_s"] = size / timed(lambda: entry.open().read(), repeat) / (1 << 20)
+            latencies = []
+
+            for _ in range(RANDOM_READS):
+                offset = rnd.randrange(max(1, size - RANDOM_READ_SIZE))
+                start = perf_counter()
+                entry.read(RANDOM_READ_SIZE, offset)
+                latencies.append(perf_counter() - start)
+
+        results["random_p50_us"] = percentile(latencies, 0.5) * 1e6
+        results["random_p99_us"] = percentile(latencies, 0.99) * 1e6
+
+    return results
+
+
+def higher_is_better(metric):
+    return metric.endswith("_mb_s")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+
+    for scenario, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            base = baseline.get(scenario, {}).get(metric)
+
+            if not base or metric == "files":
+                continue
+
+            ratio = value / base if higher_is_better(metric) else base / value
+            flag = ""
+
+            if ratio < 1 - tolerance:
+                flag = "  REGRESSION"
+                regressions.append((scenario, metric))
+
+            print("{:<14} {:<14} {:>12.2f} {:>12.2f} {:>7.2f}x{}".format(scenario, metric, value, base, ratio, flag))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="Benchmark FAT readers on synthetic volumes")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run, may repeat (default: all)")
+    parser.add_argument("-r", "--reader", default="pread", choices=sorted(READERS))
+    parser.add_argument("-n", "--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--images", help="directory to keep generated images in (default: temporary)")
+    parser.add_argument("--save", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    with TemporaryDirectory() as tmp:
+        images = args.images or tmp
+        os.makedirs(images, exist_ok=True)
+        results = {}
+
+        for name in args.scenario or sorted(SCENARIOS):
+            path = os.path.join(images, "{}-{}.img".format(name, args.seed))
+
+            if not os.path.exists(path):
+                make_image(path, SCENARIOS[name], args.seed)
+
+            results[name] = run_scenario(path, READERS[args.reader], args.repeat, args.seed)
+
+            if not args.baseline:
+                print(name, json.dumps(results[name], sort_keys=True))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return 1 if compare(results, json.load(f), args.tolerance) else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+from collections import namedtuple
+from struct import Struct
+
+
+def compile_struct(sign):
+    # Single little-endian struct for a whole (offset, size, name, unpack string) table, gaps are padded
+    fmt, ptr = "<", 0
+
+    for offset, size, name, unpack_str in sign:
+        if offset < ptr:
+            raise ValueError("Field '{}' overlaps the previous one".format(name))
+
+        if Struct(unpack_str).size != size:
+            raise ValueError("Field '{}' size does not match '{}'".format(name, unpack_str))
+
+        fmt += "{}x".format(offset - ptr) if offset > ptr else ""
+        fmt += unpack_str.lstrip("<")
+        ptr = offset + size
+
+    return Struct(fmt)
+
+
+class Codec:
+    # Signature table compiled to one precompiled struct and the namedtuple of its fields
+    def __init__(self, name, sign):
+        self.sign = sign
+        self.struct = compile_struct(sign)
+        self.tuple = namedtuple(name, (it[2] for it in sign))
+        self.size = self.struct.size
+
+    def offset(self, name):
+        return next(offset for offset, _, field, _ in self.sign if field == name)
+
+    def unpack(self, data, ptr=0):
+        return self.tuple._make(self.struct.unpack_from(data, ptr))
+
+    def pack(self, value):
+        return self.struct.pack(*value)
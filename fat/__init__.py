@@ -1,9 +1,22 @@
+from fat.aio import AsyncFATReader
+from fat.catalog import FATCatalog
+from fat.check import check_volume
+from fat.diff import diff_volumes
 from fat.fat12 import FAT12Reader
 from fat.fat16 import FAT16Reader
 from fat.fat32 import FAT32Reader
+from fat.scan import scan_volume
+from fat.volume import fat_type, open_volume
 
 __all__ = [
+    "AsyncFATReader",
+    "FATCatalog",
     "FAT12Reader",
     "FAT16Reader",
-    "FAT32Reader"
+    "FAT32Reader",
+    "check_volume",
+    "diff_volumes",
+    "fat_type",
+    "open_volume",
+    "scan_volume"
 ]
@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import SEEK_SET, SEEK_CUR, SEEK_END
+
+from .fat import FATEntry, FATEntryNonFile
+
+
+class AsyncReader:
+    # Awaitable reads over a blocking reader. Reads issued within one event loop iteration are batched into a single
+    # executor job and served in offset order. Readers that are not thread safe get a single worker.
+    MAX_WORKERS = 4
+
+    def __init__(self, reader, executor=None, max_workers=MAX_WORKERS):
+        self.reader = reader
+        # Only an executor created here is shut down on close, a given one belongs to the caller
+        self.owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers if reader.thread_safe else 1)
+        self._batch = []
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+
+    def _read_batch(self, batch):
+        results = [None] * len(batch)
+
+        for i, ((size, rel_ptr, base_ptr), _) in sorted(enumerate(batch), key=lambda i: (i[1][0][2] or 0) + i[1][0][1]):
+            try:
+                results[i] = (self.reader.read(size, rel_ptr, base_ptr), None)
+            except Exception as ex:
+                results[i] = (None, ex)
+
+        return results
+
+    @staticmethod
+    def _resolve(batch, job):
+        for i, (_, future) in enumerate(batch):
+            if future.cancelled():
+                continue
+
+            if job.exception() is not None:
+                future.set_exception(job.exception())
+                continue
+
+            data, ex = job.result()[i]
+            future.set_exception(ex) if ex is not None else future.set_result(data)
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        job = asyncio.get_running_loop().run_in_executor(self.executor, self._read_batch, batch)
+        job.add_done_callback(partial(self._resolve, batch))
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        if not self._batch:
+            loop.call_soon(self._flush)
+
+        self._batch.append(((size, rel_ptr, base_ptr), future))
+        return future
+
+    def close(self):
+        if self.owns_executor:
+            self.executor.shutdown()
+
+
+class AsyncFATStream:
+    def __init__(self, entry):
+        self.entry = entry
+        self.ptr = 0
+
+    def tell(self):
+        return self.ptr
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence not in (SEEK_SET, SEEK_CUR, SEEK_END):
+            raise ValueError("Invalid whence ({}, should be 0, 1 or 2)".format(whence))
+
+        self.ptr = max(offset + (0, self.ptr, self.entry.size)[whence], 0)
+        return self.ptr
+
+    async def read(self, size=-1):
+        size = min(self.entry.size - self.ptr, self.entry.size if size < 0 else size)
+
+        if size <= 0:
+            return b""
+
+        data = await self.entry.read(size, self.ptr)
+        self.ptr += len(data)
+        return data
+
+    def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        self.close()
+
+
+class AsyncFATEntry:
+    # Wraps a FATEntry (or the root FATDir); metadata is read from the wrapped object, I/O is awaitable
+    def __init__(self, volume, entry):
+        self.volume = volume
+        self.entry = entry
+
+    def __getattr__(self, item):
+        return getattr(self.entry, item)
+
+    async def read(self, size=0, offset=0):
+        if not isinstance(self.entry, FATEntry) or self.entry.is_directory:
+            raise FATEntryNonFile("Could not read directory as a file")
+
+        entry = self.entry
+        end = min(offset + (size or entry.size), entry.size)
+        layout = await self.volume.reader.run(lambda: list(entry.entry_reader.layout(offset, end)))
+
+        return b"".join(
+            await asyncio.gather(*(self.volume.reader.read(length, ptr, entry.data_ptr) for _, ptr, length in layout))
+        )
+
+    def open(self):
+        if not isinstance(self.entry, FATEntry) or self.entry.is_directory:
+            raise FATEntryNonFile("Could not read directory as a file")
+
+        return AsyncFATStream(self)
+
+    async def __aiter__(self):
+        entries, _, _ = await self.volume.reader.run(self.volume.volume._dir_listing, self.entry)
+
+        for entry in entries:
+            yield AsyncFATEntry(self.volume, entry)
+
+
+class AsyncFATReader:
+    def __init__(self, volume, executor=None, max_workers=AsyncReader.MAX_WORKERS):
+        self.volume = volume
+        self.reader = AsyncReader(volume.reader, executor, max_workers)
+
+    async def lookup(self, path):
+        return AsyncFATEntry(self, await self.reader.run(self.volume.lookup, path))
+
+    async def scandir(self, path="/"):
+        async for entry in await self.lookup(path):
+            yield entry
+
+    async def open(self, path):
+        return (await self.lookup(path)).open()
+
+    def close(self):
+        self.reader.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        self.close()
@@ -0,0 +1,112 @@
+import sqlite3
+from collections import deque
+from io import UnsupportedOperation
+from os import fstat
+from struct import pack
+from threading import Lock
+from zlib import crc32
+
+from .fat import decode_le_array
+
+
+class FATCatalog:
+    # Sidecar SQLite file with the directory tree, raw directory records and extents of a volume, so listings and
+    # lookups of an unchanged image never touch its directory clusters. Rebuilt whenever the volume key changes.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS volume (key TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS entries (dir INTEGER NOT NULL, record BLOB NOT NULL, lfn BLOB, extents BLOB);
+        CREATE INDEX IF NOT EXISTS entries_dir ON entries (dir);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(self.SCHEMA)
+
+    @staticmethod
+    def volume_key(volume):
+        # Size and modification time of the backing file (readers wrapping another one forward its `fs`) and the
+        # checksums of the FAT and of the root directory records, which still catch changes without a file
+        root = volume.root_dir
+
+        try:
+            stat = fstat(volume.reader.fs.fileno())
+        except (AttributeError, OSError, UnsupportedOperation):
+            # No reader file or no descriptor behind it, such as an in-memory image
+            stat = None
+
+        return "{:08X}:{}:{}:{:08X}:{:08X}".format(
+            volume.boot_sector.data.VolumeID,
+            stat.st_size if stat else 0,
+            stat.st_mtime_ns if stat else 0,
+            crc32(volume.primary_fat.raw()),
+            crc32(root.entry_reader.read(root.size, 0, root.base_ptr))
+        )
+
+    @staticmethod
+    def _pack_extents(extents):
+        return pack("<{}I".format(len(extents) * 2), *(i for extent in extents for i in extent))
+
+    @staticmethod
+    def _unpack_extents(data):
+        values = decode_le_array("I", data)
+        return list(zip(values[0::2], values[1::2]))
+
+    def _scan(self, volume):
+        queue, visited = deque([(0, volume.root_dir)]), {0}
+
+        while queue:
+            cluster, directory = queue.popleft()
+
+            for entry in directory.scandir():
+                yield cluster, bytes(entry.record), entry.lfn, self._pack_extents(entry.extents)
+
+                if entry.is_directory and entry.cluster not in visited:
+                    visited.add(entry.cluster)
+                    queue.append((entry.cluster, entry))
+
+    def is_current(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT key FROM volume").fetchone()
+
+        return row is not None and row[0] == key
+
+    def build(self, volume, key=None):
+        key = key or self.volume_key(volume)
+        rows = list(self._scan(volume))
+
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM volume")
+            self.db.execute("DELETE FROM entries")
+            self.db.executemany("INSERT INTO entries (dir, record, lfn, extents) VALUES (?, ?, ?, ?)", rows)
+            self.db.execute("INSERT INTO volume (key) VALUES (?)", (key,))
+
+    def sync(self, volume):
+        key = self.volume_key(volume)
+
+        if not self.is_current(key):
+            self.build(volume, key)
+
+    def entries(self, volume, cluster):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT record, lfn, extents FROM entries WHERE dir = ? ORDER BY rowid", (cluster,)
+            ).fetchall()
+
+        entries = [volume.root_dir._make_entry(record, lfn) for record, lfn, _ in rows]
+
+        for entry, (_, _, extents) in zip(entries, rows):
+            if entry.cluster:
+                volume.primary_fat.cache_extents(entry.cluster, self._unpack_extents(extents))
+
+        return entries
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,165 @@
+from bisect import bisect_left
+from collections import Counter, deque, namedtuple
+from re import finditer
+
+from .fat import FATEntryReader, FATException, nonzero_flags
+
+
+class FATCheckReport(namedtuple("FATCheckReport", (
+        "fat_mismatches",  # {FAT copy: [clusters whose value differs from the primary FAT]}
+        "out_of_range",  # [(cluster, value)] links past the data area
+        "free_links",  # [(cluster, value)] links to free clusters
+        "cycles",  # [cluster] one cluster of every loop
+        "cross_links",  # [cluster] clusters reached from more than one chain or entry
+        "lost_chains",  # [cluster] chains not referenced by any directory entry
+        "bad_entries",  # [(path, cluster)] entries whose first cluster is outside the data area or free
+        "size_mismatches",  # [(path, size, chain size)] files whose FileSize does not fit their chain
+        "errors"  # [(path, message)] directories that could not be read
+))):
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return not any(self)
+
+
+def compare_fats(volume):
+    # Every copy is compared with the primary one as a whole, differing entries are located from the XOR of both
+    primary, mismatches = volume.primary_fat.entries, {}
+
+    for copy, table in enumerate(volume.fats[1:], 1):
+        if table.entries == primary:
+            continue
+
+        a, b = primary.tobytes(), table.entries.tobytes()
+        diff = (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(max(len(a), len(b)), "little")
+        mismatches[copy] = [m.start() for m in finditer(b"\x01", nonzero_flags(diff, primary.itemsize))]
+
+    return mismatches
+
+
+def _link_runs(table, clusters, report):
+    # Next run and entry index of every run, one lookup per run end. Links past the data area, to free clusters or
+    # into the middle of a run are reported here
+    entries, _, starts, ends = table.runs(clusters)
+    clusters, links, targets = len(entries), [None] * len(ends), Counter()
+
+    for r, end in enumerate(ends):
+        value = entries[end]
+
+        if table._is_eof(value) and value != 1:
+            continue
+
+        idx = value - 2
+        run = bisect_left(ends, idx)
+
+        if not 0 <= idx < clusters:
+            report.out_of_range.append((end + 2, value))
+        elif run == len(ends) or idx < starts[run]:
+            report.free_links.append((end + 2, value))
+        else:
+            links[r] = (run, idx)
+            targets[idx] += 1
+
+    return links, targets
+
+
+def _chain_tails(table, clusters, links, report):
+    # Clusters following every run up to the end of its chain, None for chains ending in a loop. Every run is
+    # visited once: paths are followed until a finished run, the end of a chain or a run of the current path
+    _, _, starts, ends = table.runs(clusters)
+    state, tails = [0] * len(ends), [0] * len(ends)
+
+    for first in range(len(ends)):
+        path, run = [], first
+
+        while run is not None and not state[run]:
+            state[run] = 1
+            path.append(run)
+            run = links[run][0] if links[run] else None
+
+        if run is not None and state[run] == 1:
+            report.cycles.append(starts[run] + 2)
+            tails[run] = None
+
+        for run in reversed(path):
+            state[run] = 2
+
+            if links[run] is not None:
+                next_run, idx = links[run]
+                tails[run] = None if tails[next_run] is None else ends[next_run] - idx + 1 + tails[next_run]
+
+    return tails
+
+
+def _chain_length(table, clusters, tails, cluster):
+    # Clusters of the chain from `cluster` on, None if it loops, 0 if the cluster is free
+    _, _, starts, ends = table.runs(clusters)
+    idx = cluster - 2
+    run = bisect_left(ends, idx)
+
+    if run == len(ends) or idx < starts[run]:
+        return 0
+
+    return None if tails[run] is None else ends[run] - idx + 1 + tails[run]
+
+
+def check_volume(volume):
+    # fsck-like verification of the FAT copies, cluster chains and directory tree in time linear in the table size
+    # and the number of entries. Nothing is written, problems are collected into a `FATCheckReport`
+    report = FATCheckReport(compare_fats(volume), [], [], [], [], [], [], [], [])
+    table, clusters, cluster_size = volume.primary_fat, volume.boot_sector.clusters, volume.boot_sector.cluster_size
+
+    links, targets = _link_runs(table, clusters, report)
+    tails = _chain_tails(table, clusters, links, report)
+    entries, _, starts, _ = table.runs(clusters)
+    starts = set(starts)
+
+    # Chain heads are run starts nothing links to, a link into the middle of a run shares that run's tail
+    bad_cluster = table._get_bad_cluster()
+    heads = {idx for idx in starts if not targets[idx] and entries[idx] != bad_cluster}
+    cross_links = {idx + 2 for idx, count in targets.items() if count > 1 or idx not in starts}
+
+    root = volume.root_dir.entry_reader
+    references = Counter([root.cluster] if isinstance(root, FATEntryReader) else [])
+    queue, visited = deque([("/", volume.root_dir)]), set(references)
+
+    while queue:
+        path, directory = queue.popleft()
+
+        try:
+            listing = list(directory.scandir())
+        except FATException as e:
+            report.errors.append((path, str(e)))
+            continue
+
+        for entry in listing:
+            entry_path, cluster = path.rstrip("/") + "/" + entry.name, entry.cluster
+
+            if not cluster:
+                if entry.is_directory or entry.size:
+                    report.bad_entries.append((entry_path, cluster))
+
+                continue
+
+            length = _chain_length(table, clusters, tails, cluster) if 2 <= cluster < clusters + 2 else 0
+
+            if length == 0:
+                # Outside of the data area or a free cluster
+                report.bad_entries.append((entry_path, cluster))
+                continue
+
+            references[cluster] += 1
+
+            if not entry.is_directory:
+                if length is not None and length != -(-entry.size // cluster_size):
+                    report.size_mismatches.append((entry_path, entry.size, length * cluster_size))
+            elif length is not None and cluster not in visited:
+                visited.add(cluster)
+                queue.append((entry_path, entry))
+
+    cross_links.update(cluster for cluster, count in references.items() if count > 1 or cluster - 2 not in heads)
+    report.cross_links.extend(sorted(cross_links))
+    report.lost_chains.extend(sorted(idx + 2 for idx in heads if idx + 2 not in references))
+
+    return report
@@ -0,0 +1,119 @@
+from collections import defaultdict, deque, namedtuple
+
+FATDiff = namedtuple("FATDiff", "added removed modified moved")  # lists of paths, `moved` of (old, new) pairs
+
+
+def _dir_data(directory):
+    # Raw records of a directory, the root one or a directory entry
+    directory = directory._create_dir_entry() if hasattr(directory, "_create_dir_entry") else directory
+    return bytes(directory.entry_reader.read(directory.size, 0, directory.base_ptr))
+
+
+def _files(volume, path, entry):
+    # Every file below a directory that exists on one side only
+    if not entry.is_directory:
+        return [(path, entry)]
+
+    return [
+        (root.rstrip("/") + "/" + e.name, e) for root, _, entries in volume.walk(path) for e in entries
+    ]
+
+
+def _same_content(a_entry, b_entry, fats_equal):
+    # Without reading data: same first cluster, size and modification time, and the same chain
+    return (
+        a_entry.cluster == b_entry.cluster and a_entry.size == b_entry.size
+        and a_entry.modified == b_entry.modified
+        and (fats_equal or a_entry.extents == b_entry.extents)
+    )
+
+
+def _identity(entry):
+    return entry.cluster, entry.size, entry.modified
+
+
+def diff_volumes(a, b, algorithm="sha256", workers=4):
+    # Added, removed, modified and moved files from volume `a` to volume `b`. Both trees are walked together,
+    # directories with byte-identical records are not matched by name and files whose first cluster, size, time and
+    # chain are unchanged are not read (data rewritten in place without touching them goes unnoticed). Only files
+    # left ambiguous by that with the same size on both sides are hashed, moves are matched first by layout and
+    # then by digest.
+    fats_equal = a.primary_fat.entries == b.primary_fat.entries
+    added, removed, candidates = [], [], []
+    queue = deque([("/", a.root_dir, b.root_dir)])
+
+    while queue:
+        path, a_dir, b_dir = queue.popleft()
+        prefix = path.rstrip("/") + "/"
+        a_entries = a._dir_listing(a_dir)[0]
+
+        if _dir_data(a_dir) == _dir_data(b_dir):
+            # Same records, only subdirectories can still differ and only if the FATs do
+            b_entries = b._dir_listing(b_dir)[0]
+
+            for a_entry, b_entry in zip(a_entries, b_entries):
+                if a_entry.is_directory:
+                    queue.append((prefix + a_entry.name, a_entry, b_entry))
+                elif not _same_content(a_entry, b_entry, fats_equal):
+                    candidates.append((prefix + a_entry.name, a_entry, b_entry))
+
+            continue
+
+        b_by_name = {e.name: e for e in b._dir_listing(b_dir)[0]}
+
+        for a_entry in a_entries:
+            entry_path, b_entry = prefix + a_entry.name, b_by_name.pop(a_entry.name, None)
+
+            if b_entry is None or a_entry.is_directory != b_entry.is_directory:
+                removed.extend(_files(a, entry_path, a_entry))
+                added.extend(_files(b, entry_path, b_entry) if b_entry is not None else ())
+            elif a_entry.is_directory:
+                queue.append((entry_path, a_entry, b_entry))
+            elif not _same_content(a_entry, b_entry, fats_equal):
+                candidates.append((entry_path, a_entry, b_entry))
+
+        for b_entry in b_by_name.values():
+            added.extend(_files(b, prefix + b_entry.name, b_entry))
+
+    # Moves with the data left in place keep their layout, the rest can only be matched by content
+    added, removed, moved = dict(added), dict(removed), []
+    by_identity = defaultdict(list)
+
+    for path, entry in removed.items():
+        by_identity[_identity(entry)].append(path)
+
+    for path, entry in list(added.items()):
+        same = by_identity.get(_identity(entry))
+
+        if entry.cluster and same and removed[same[-1]].extents == entry.extents:
+            moved.append((same.pop(), path))
+            del removed[moved[-1][0]], added[path]
+
+    sizes = {e.size for e in removed.values()} & {e.size for e in added.values()}
+    a_hash = [(path, e) for path, e in removed.items() if e.size in sizes]
+    b_hash = [(path, e) for path, e in added.items() if e.size in sizes]
+    a_hash.extend((path, a_entry) for path, a_entry, b_entry in candidates if a_entry.size == b_entry.size)
+    b_hash.extend((path, b_entry) for path, a_entry, b_entry in candidates if a_entry.size == b_entry.size)
+
+    a_digests = a.hash_files(a_hash, algorithm, workers) if a_hash else {}
+    b_digests = b.hash_files(b_hash, algorithm, workers) if b_hash else {}
+
+    modified = [
+        path for path, a_entry, b_entry in candidates
+        if a_entry.size != b_entry.size or a_digests[path] != b_digests[path]
+    ]
+
+    by_digest = defaultdict(list)
+
+    for path, entry in removed.items():
+        if path in a_digests:
+            by_digest[entry.size, a_digests[path]].append(path)
+
+    for path, entry in list(added.items()):
+        same = by_digest.get((entry.size, b_digests.get(path)))
+
+        if same:
+            moved.append((same.pop(), path))
+            del removed[moved[-1][0]], added[path]
+
+    return FATDiff(sorted(added), sorted(removed), sorted(modified), sorted(moved))
@@ -1,9 +1,23 @@
+from array import array
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from bisect import bisect_left, bisect_right
 from functools import reduce
-from itertools import accumulate, takewhile, repeat
-from struct import unpack
-
+from hashlib import new as new_hash
+from operator import or_
+from io import BufferedReader, RawIOBase, DEFAULT_BUFFER_SIZE, SEEK_SET, SEEK_CUR, SEEK_END
+from itertools import accumulate, chain, islice, takewhile, repeat
+from os import makedirs, utime
+from os.path import join as join_path
+from re import finditer
+from sys import byteorder, getsizeof
+from threading import Lock
+
+from metrics import timer
 from reader import Reader
-from utils import groupby, slice_len
+from utils import groupby, prefetch_map, LRUCache
 
 
 class FATException(Exception):
@@ -14,6 +28,10 @@ class FATIndexOutOfBounds(FATException):
     pass
 
 
+class FATChainLoop(FATException):
+    pass
+
+
 class FATEntryError(FATException):
     pass
 
@@ -26,6 +44,16 @@ class FATEntryNonFile(FATEntryError):
     pass
 
 
+class FATEntryNotFound(FATEntryError):
+    pass
+
+
+FATRuns = namedtuple("FATRuns", "entries used starts ends")
+FATAllocation = namedtuple("FATAllocation", "clusters free bad largest_free_run bitmap chain_fragments")
+FATStat = namedtuple("FATStat", "cluster_size clusters free used bad largest_free_run")
+FATFragmentation = namedtuple("FATFragmentation", "chains fragmented fragments histogram")
+
+
 # region: Utils
 
 def not_implemented():
@@ -42,6 +70,29 @@ def decode_lfn(data):
     ).decode("utf-16-le", errors="replace")
 
 
+def split_path(path):
+    return reduce(
+        lambda a, p: a[:-1] if p == ".." else a if p in ("", ".") else a + [p],
+        path.replace("\\", "/").split("/"),
+        []
+    )
+
+
+def decode_dos_datetime(date, time=0):
+    # Local time, years since 1980 and two second resolution. Zero or invalid stamps decode to None
+    try:
+        return datetime(
+            1980 + (date >> 9), date >> 5 & 0xF, date & 0x1F, time >> 11, time >> 5 & 0x3F, (time & 0x1F) * 2
+        )
+    except ValueError:
+        return None
+
+
+def index_entries(entries):
+    # Name lookup tables: long names match exactly, short names case-insensitively
+    return {e.name: e for e in entries if e.lfn}, {e.short_name.upper(): e for e in entries}
+
+
 def decode_sfn(data):
     return (b"".join(
         map(
@@ -53,14 +104,69 @@ def decode_sfn(data):
     ).decode("ascii", errors="replace")
 
 
+def sfn_checksum(name):
+    # Checksum of the 11 byte short name stored in every long name slot of the entry
+    checksum = 0
+
+    for c in name:
+        checksum = ((checksum & 1) << 7) + (checksum >> 1) + c & 0xFF
+
+    return checksum
+
+
+def decode_le_array(typecode, data):
+    table = array(typecode)
+    table.frombytes(data[:len(data) - len(data) % table.itemsize])
+
+    if byteorder == "big":
+        table.byteswap()
+
+    return table
+
+
+def nonzero_flags(data, itemsize):
+    # One byte per little-endian item of `data`, 1 where the item is non-zero. Bytes are reduced by OR-ing each
+    # byte lane of the items as one big integer
+    lanes = bytes(data).translate(NONZERO_BYTES)
+
+    return reduce(or_, (int.from_bytes(lanes[i::itemsize], "little") for i in range(itemsize)), 0).to_bytes(
+        len(lanes) // itemsize, "little"
+    )
+
+
+def pack_bits(flags):
+    # 0/1 flag bytes to a bitmap, flag `i` is bit `i % 8` of byte `i // 8`
+    flags = bytes(flags) + bytes(-len(flags) % 8)
+
+    return reduce(or_, (int.from_bytes(flags[i::8], "little") << i for i in range(8)), 0).to_bytes(
+        len(flags) // 8, "little"
+    )
+
+
+NONZERO_BYTES = bytes([0]) + bytes([1]) * 255
+
+
 # endregion
 
 
 class FATTable:
-    def __init__(self, reader, base_ptr, size):
+    # Budget of the extents cache in (start_cluster, run_length) runs
+    EXTENTS_CACHE_SIZE = 1024 * 1024
+
+    def __init__(self, reader, base_ptr, size, preload=False, metrics=None):
         self.reader = reader
         self.base_ptr = base_ptr
         self.size = size
+        self.preload = preload
+        # Shared with the directories and entry readers built over this table, see `metrics.Metrics`
+        self.metrics = metrics
+        self._entries = None
+        # Chains by first cluster, seeded by the catalog for every listed entry. Shared with the `walk` prefetch
+        # thread, chains themselves are walked outside of the lock
+        self._extents = LRUCache(self.EXTENTS_CACHE_SIZE, len)
+        self._extents_lock = Lock()
+        self._runs = None
+        self._allocation = None
 
     def _validate_idx(self, idx):
         raise not_implemented()
@@ -72,20 +178,146 @@ class FATTable:
     def _is_eof(self, val):
         raise not_implemented()
 
+    def __len__(self):
+        raise not_implemented()
+
+    def _decode(self, data):
+        raise not_implemented()
+
+    def _get_bad_cluster(self):
+        raise not_implemented()
+
+    @property
+    def entries(self):
+        # Whole table decoded by one bulk read, `entries[cluster]` is the next cluster value
+        if self._entries is None:
+            with timer(self.metrics, "fat_decode"):
+                self._entries = self._decode(self.raw())
+
+        return self._entries
+
+    def raw(self):
+        return self.reader.read(self.size, 0, self.base_ptr)
+
     def __getitem__(self, item):
+        if self.metrics is not None:
+            self.metrics.count("fat_lookups")
+
+        if self.preload:
+            try:
+                return self.entries[item]
+            except IndexError:
+                raise FATIndexOutOfBounds("Out of bounds")
+
         self._validate_idx(item)
         return self._get(item)
 
+    def extents(self, idx):
+        # Chain starting at `idx` as a list of contiguous (start_cluster, run_length) runs
+        with self._extents_lock:
+            extents = self._extents.get(idx)
+
+        if extents is None:
+            with timer(self.metrics, "fat_walk"):
+                extents = [
+                    (run[0], len(run)) for run in map(list, groupby(lambda a, b: b == a + 1, self.iter(idx)))
+                ]
+
+            if sum(length for _, length in extents) >= len(self):
+                raise FATChainLoop("Cluster chain starting at {} loops".format(idx))
+
+            self.cache_extents(idx, extents)
+
+        return extents
+
+    def runs(self, clusters):
+        # Contiguous runs of the first `clusters` data clusters, cached per table. Returns the entries (index 0 is
+        # cluster 2), their 0/1 allocation flags and the first and last index of every run. Flags are computed over
+        # whole byte strings, only run ends are visited one by one
+        if self._runs is not None:
+            return self._runs
+
+        entries = self.entries[2: clusters + 2]
+        clusters, itemsize = len(entries), entries.itemsize
+        data = entries.tobytes()
+        used = nonzero_flags(data, itemsize)
+
+        # An allocated cluster ends a run when its value is anything but the next cluster or when the next cluster is
+        # free (a corrupted link into it) or past the data area, so every run is some free clusters after the
+        # previous end followed by allocated ones up to its own end
+        ramp = array(entries.typecode, range(3, clusters + 3)).tobytes()
+        breaks = nonzero_flags((int.from_bytes(data, "little") ^ int.from_bytes(ramp, "little")).to_bytes(
+            len(data), "little"
+        ), itemsize)
+        next_free = int.from_bytes(used[1:] + b"\x00", "little") ^ int.from_bytes(b"\x01" * clusters, "little")
+        ends = [m.start() for m in finditer(b"\x01", (
+            (int.from_bytes(breaks, "little") | next_free) & int.from_bytes(used, "little")
+        ).to_bytes(clusters, "little"))]
+        starts = [used.rfind(b"\x00", prev + 1, end) + 1 or prev + 1 for prev, end in zip([-1] + ends, ends)]
+
+        self._runs = FATRuns(entries, used, starts, ends)
+        return self._runs
+
+    def allocation(self, clusters):
+        # Free space and fragments per chain from the runs of the table, cached per table
+        if self._allocation is not None:
+            return self._allocation
+
+        bad_cluster = self._get_bad_cluster()
+        entries, used, starts, ends = self.runs(clusters)
+        clusters = len(entries)
+        targets = {entries[i] - 2 for i in ends if not self._is_eof(entries[i])}
+        chain_fragments = Counter()
+
+        for head in set(starts) - targets:
+            if entries[head] == bad_cluster:
+                continue
+
+            fragments, idx = 0, head
+
+            # A chain has at most as many fragments as there are run ends, anything longer loops
+            while fragments < len(ends) and 0 <= idx < clusters:
+                end = bisect_left(ends, idx)
+
+                if end == len(ends) or idx < starts[end]:
+                    # Link to a free cluster
+                    break
+
+                fragments += 1
+
+                if self._is_eof(entries[ends[end]]):
+                    break
+
+                idx = entries[ends[end]] - 2
+
+            chain_fragments[fragments] += 1
+
+        self._allocation = FATAllocation(
+            clusters,
+            used.count(0),
+            entries.count(bad_cluster),
+            max((m.end() - m.start() for m in finditer(b"\x00+", used)), default=0),
+            pack_bits(b"\x01\x01" + used),
+            chain_fragments
+        )
+
+        return self._allocation
+
+    def cache_extents(self, idx, extents):
+        with self._extents_lock:
+            self._extents.put(idx, extents)
+
     def iter(self, idx):
+        # Stops after as many clusters as the table has entries, a chain that long can only be a loop
         self._validate_idx(idx)
 
-        return takewhile(
+        return islice(takewhile(
             lambda c: not self._is_eof(c),
             accumulate(
                 repeat(idx),
                 lambda a, _: self[a]
             )
-        )
+        ), len(self))
 
 
 class FATEntryReader(Reader):
@@ -95,32 +327,157 @@ class FATEntryReader(Reader):
         self.cluster = cluster
         self.cluster_size = cluster_size
         self.data_ptr = data_ptr
+        self._extent_ends = None
+
+    @property
+    def extents(self):
+        return self.table.extents(self.cluster)
+
+    @property
+    def extent_ends(self):
+        # Cumulative byte offset of each extent end, lets an offset be mapped to its extent by bisection
+        if self._extent_ends is None:
+            self._extent_ends = list(accumulate(length * self.cluster_size for _, length in self.extents))
+
+        return self._extent_ends
+
+    def _spans(self, offset, end):
+        # Physical (data area relative) pointer and length of every extent piece overlapping [offset, end)
+        extents, ends = self.extents, self.extent_ends
+
+        for i in range(bisect_right(ends, offset), len(ends)):
+            (start, length), extent_end = extents[i], ends[i]
+            ptr = extent_end - length * self.cluster_size
+            lo, hi = max(offset, ptr), extent_end if end is None else min(end, extent_end)
+
+            if lo >= hi:
+                break
+
+            yield (start - 2) * self.cluster_size + lo - ptr, hi - lo
+
+    def layout(self, offset=0, end=None):
+        # (logical offset, data area relative pointer, length) of every extent piece overlapping [offset, end)
+        for ptr, length in self._spans(offset, end):
+            yield offset, ptr, length
+            offset += length
 
     def read(self, size=0, rel_ptr=0, base_ptr=None):
         offset = rel_ptr + (base_ptr or 0)
 
-        return reduce(
-            lambda a, i: a + self.reader.read(
-                self.cluster_size if size == 0 else min(size - len(a), self.cluster_size),
-                (i[1] - 2) * self.cluster_size + offset % self.cluster_size,
-                self.data_ptr
-            ),
-            takewhile(
-                lambda c: size == 0 or c[0] * self.cluster_size < offset + size,
-                filter(
-                    lambda c: size == 0 or c[0] >= offset // self.cluster_size,
-                    enumerate(self.table.iter(self.cluster))
-                )
-            ),
-            bytearray()
-        )
+        with timer(self.table.metrics, "data_read"):
+            data = bytearray().join(
+                self.reader.read(length, ptr, self.data_ptr)
+                for ptr, length in self._spans(offset, offset + size if size else None)
+            )
+
+        if self.table.metrics is not None:
+            self.table.metrics.count("data_bytes", len(data))
+
+        return data
+
+    def readinto(self, buffer, offset=0):
+        view = memoryview(buffer).cast("B")
+        copied = 0
+
+        with timer(self.table.metrics, "data_read"):
+            for ptr, length in self._spans(offset, offset + len(view)):
+                copied += self.reader.readinto(view[copied: copied + length], ptr, self.data_ptr)
+
+        if self.table.metrics is not None:
+            self.table.metrics.count("data_bytes", copied)
+
+        return copied
 
     def size(self):
-        return reduce(
-            lambda a, _: a + self.cluster_size,
-            self.table.iter(self.cluster),
-            0
-        )
+        return self.extent_ends[-1] if self.extent_ends else 0
+
+
+class FATEntryIO(RawIOBase):
+    # Seekable raw stream over file contents, reads go straight into the caller buffer. With `read_ahead` set,
+    # sequential reads grow a read-ahead window up to that many bytes, filled on `executor` when given (which needs
+    # a reader safe for concurrent use) or right after the current request otherwise
+    READ_AHEAD = 1024 * 1024
+
+    def __init__(self, entry_reader, size, name=None, read_ahead=0, executor=None):
+        super().__init__()
+
+        self.entry_reader = entry_reader
+        self.size = size
+        self.name = name
+        self.ptr = 0
+        self.read_ahead = read_ahead
+        self.executor = executor
+        self._next = None
+        self._window = 0
+        self._buffer = bytearray()
+        self._pending = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.ptr
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence not in (SEEK_SET, SEEK_CUR, SEEK_END):
+            raise ValueError("Invalid whence ({}, should be 0, 1 or 2)".format(whence))
+
+        self.ptr = max(offset + (0, self.ptr, self.size)[whence], 0)
+        return self.ptr
+
+    def close(self):
+        # A pending read-ahead is left to finish on its own, only its result is dropped
+        self._buffer, self._pending = bytearray(), None
+        super().close()
+
+    def _readinto_ahead(self, view):
+        # The buffer always holds the data right after the previous request, anything else is random access
+        offset, end = self.ptr, self.ptr + len(view)
+
+        if offset == self._next:
+            self._window = min(max(self._window * 2, self.entry_reader.cluster_size), self.read_ahead)
+        else:
+            self._window, self._buffer, self._pending = 0, bytearray(), None
+
+        self._next = end
+
+        if self._pending is not None and (self._pending.done() or len(view) > len(self._buffer)):
+            self._buffer += self._pending.result()
+            self._pending = None
+
+        copied = min(len(view), len(self._buffer))
+        view[:copied] = self._buffer[:copied]
+        del self._buffer[:copied]
+
+        if copied < len(view):
+            copied += self.entry_reader.readinto(view[copied:], offset + copied)
+
+        if self._window and len(self._buffer) < self._window:
+            ahead = offset + copied + len(self._buffer)
+
+            if self.executor is None:
+                self._buffer += self.entry_reader.read(self._window, ahead)
+            elif self._pending is None:
+                self._pending = self.executor.submit(self.entry_reader.read, self._window, ahead)
+
+        return copied
+
+    def readinto(self, buffer):
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+        view = memoryview(buffer).cast("B")[:max(self.size - self.ptr, 0)]
+
+        if self.read_ahead and view:
+            copied = self._readinto_ahead(view)
+        else:
+            copied = self.entry_reader.readinto(view, self.ptr)
+
+        self.ptr += copied
+        return copied
 
 
 class FATEntry:
@@ -130,15 +487,50 @@ class FATEntry:
     DOS_PERMS_D = 0x10
     DOS_PERMS_A = 0x20
 
-    def __init__(self, basic_reader, entry_reader, table, cluster_size, params, data_ptr, lfn=None):
-        self.basic_reader = basic_reader
-        self.reader = entry_reader
-        self.table = table
-        self.cluster_size = cluster_size
-        self.params = params
+    # Only a copy of the raw directory record and the long name are kept, so cached entries do not pin the
+    # directory buffer (or a memory mapping) behind them. Fields and the entry reader are decoded on first access
+    __slots__ = ("directory", "record", "lfn", "_params", "_entry_reader")
+
+    def __init__(self, directory, record, lfn=None):
+        self.directory = directory
+        self.record = record
         self.lfn = lfn
-        self.data_ptr = data_ptr
-        self.entry_reader = self._create_entry_reader()
+        self._params = None
+        self._entry_reader = None
+
+    @property
+    def basic_reader(self):
+        return self.directory.basic_reader
+
+    @property
+    def reader(self):
+        return self.directory.entry_reader
+
+    @property
+    def table(self):
+        return self.directory.table
+
+    @property
+    def cluster_size(self):
+        return self.directory.cluster_size
+
+    @property
+    def data_ptr(self):
+        return self.directory.data_ptr
+
+    @property
+    def params(self):
+        if self._params is None:
+            self._params = self.directory._parse_entry(self.record)
+
+        return self._params
+
+    @property
+    def entry_reader(self):
+        if self._entry_reader is None:
+            self._entry_reader = self._create_entry_reader()
+
+        return self._entry_reader
 
     @staticmethod
     def _get_entry_reader_class():
@@ -152,7 +544,7 @@ class FATEntry:
         return self._get_entry_reader_class()(
             self.basic_reader,
             self.table,
-            self.params.ClusterHi << 16 | self.params.ClusterLo,
+            self.cluster,
             self.cluster_size,
             self.data_ptr
         )
@@ -163,49 +555,94 @@ class FATEntry:
             self.basic_reader,
             self.entry_reader,
             0,
-            self.entry_reader.size(),
+            None,
             self.cluster_size,
             self.data_ptr
         )
 
     @property
-    def name(self):
-        return decode_lfn(self.lfn) if self.lfn else ".".join(
+    def cluster(self):
+        return self.params.ClusterHi << 16 | self.params.ClusterLo
+
+    @property
+    def short_name(self):
+        return ".".join(
             filter(
                 lambda s: len(s),
                 map(lambda s: decode_sfn(s).strip(), (self.params.Name, self.params.Ext))
             )
         )
 
+    @property
+    def name(self):
+        return decode_lfn(self.lfn) if self.lfn else self.short_name
+
+    @property
+    def perms(self):
+        perms_offset, _, _ = self.directory._get_entry_perms()
+        return self.record[perms_offset]
+
+    @property
+    def is_dot(self):
+        return self.record[0] == 0x2E and self.record[1] in (0x20, 0x2E)
+
     @property
     def is_readonly(self):
-        return self.params.DOSPerms & self.DOS_PERMS_R
+        return self.perms & self.DOS_PERMS_R
 
     @property
     def is_hidden(self):
-        return self.params.DOSPerms & self.DOS_PERMS_H
+        return self.perms & self.DOS_PERMS_H
 
     @property
     def is_system(self):
-        return self.params.DOSPerms & self.DOS_PERMS_S
+        return self.perms & self.DOS_PERMS_S
 
     @property
     def is_directory(self):
-        return self.params.DOSPerms & self.DOS_PERMS_D
+        return self.perms & self.DOS_PERMS_D
 
     @property
     def is_archive(self):
-        return self.params.DOSPerms & self.DOS_PERMS_A
+        return self.perms & self.DOS_PERMS_A
 
     @property
     def size(self):
         return self.params.FileSize
 
-    def read(self, size=0, offset=0):
+    @property
+    def created(self):
+        return decode_dos_datetime(self.params.CDate, self.params.CTime)
+
+    @property
+    def modified(self):
+        return decode_dos_datetime(self.params.MDate, self.params.MTime)
+
+    @property
+    def accessed(self):
+        return decode_dos_datetime(self.params.ADate)
+
+    @property
+    def extents(self):
+        return self.entry_reader.extents
+
+    def open(self, buffering=DEFAULT_BUFFER_SIZE, read_ahead=0, executor=None):
         if self.is_directory:
             raise FATEntryNonFile("Could not read directory as a file")
 
-        return self.entry_reader.read(min(size, self.size) or self.size, offset)
+        stream = FATEntryIO(self.entry_reader, self.size, self.name, read_ahead, executor)
+        return BufferedReader(stream, buffering) if buffering else stream
+
+    def read(self, size=0, offset=0):
+        with self.open(buffering=0) as fs:
+            fs.seek(offset)
+            return fs.read(size or self.size)
+
+    def scandir(self):
+        if not self.is_directory:
+            raise FATEntryNonDirectory("Could not enumerate file entry")
+
+        return self._create_dir_entry().scandir()
 
     def __iter__(self):
         if not self.is_directory:
@@ -215,25 +652,28 @@ class FATEntry:
 
 
 class FATDir:
+    ENTRY_PERMS_LFN = 0xF
+    ENTRY_DELETED = 0xE5
+
     def __init__(self, table, basic_reader, entry_reader, base_ptr, size, cluster_size, data_ptr):
         self.table = table
         self.basic_reader = basic_reader
         self.entry_reader = entry_reader
         self.base_ptr = base_ptr
-        self.size = size  # FIXME: self.size = size or reader.size()
+        self._size = size
         self.cluster_size = cluster_size
         self.data_ptr = data_ptr
 
-    @staticmethod
-    def _get_entry_perms():
-        raise not_implemented()
+    @property
+    def size(self):
+        # Subdirectories and the FAT32 root take their size from the cluster chain, walked on first use
+        if self._size is None:
+            self._size = self.entry_reader.size()
 
-    @staticmethod
-    def _get_lfn():
-        raise not_implemented()
+        return self._size
 
     @staticmethod
-    def _get_entry():
+    def _get_entry_perms():
         raise not_implemented()
 
     @staticmethod
@@ -241,80 +681,80 @@ class FATDir:
         raise not_implemented()
 
     @staticmethod
-    def _get_lfn_struct():
+    def _get_entry_size():
         raise not_implemented()
 
     @staticmethod
-    def _get_entry_struct():
+    def _get_lfn_codec():
         raise not_implemented()
 
     @staticmethod
-    def _get_entry_size():
+    def _get_entry_codec():
         raise not_implemented()
 
-    def _parse_entry(self, data):
-        offset, size, unpack_str = self._get_entry_perms()
-        return self._get_lfn_struct()(
-            *(unpack(unpack_str, data[slice_len(offset, size)])[0]
-              for offset, size, _, unpack_str in self._get_lfn())
-            # FIXME: Use named constant instead value
-        ) if unpack(unpack_str, data[slice_len(offset, size)])[0] == 0xF else self._get_entry_struct()(
-            *(unpack(unpack_str, data[slice_len(offset, size)])[0]
-              for offset, size, _, unpack_str in self._get_entry())
-        )
+    def scandir(self):
+        return filter(lambda e: not e.is_dot, self)
 
-    def __iter__(self):
-        return map(
-            lambda g: self._get_entry_class()(
-                self.basic_reader,
-                self.entry_reader,
-                self.table,
-                self.cluster_size,
-                g[-1],
-                self.data_ptr,
-                reduce(
-                    lambda a, i: b"".join((a or b"", i.Name5, i.Name6, i.Name2)),
-                    sorted(
-                        filter(
-                            lambda i: i.SeqNumber != 0xE5 and i.SeqNumber <= 0x4F, g[:-1]
-                        ),
-                        key=lambda i: i.SeqNumber & 0x1F  # FIXME: Replace values to named constants
-                    ),
-                    None
-                )
-            ),
-            map(
-                list,
-                groupby(
-                    lambda l, i: all(
-                        map(lambda a: isinstance(*a),
-                            ((l, self._get_lfn_struct()), (i, (self._get_entry_struct(), self._get_lfn_struct()))))
-                    ),
-                    takewhile(
-                        lambda i: isinstance(i, self._get_lfn_struct()) or any(
-                            map(lambda s: s[0] != 0, (i.Name, i.Ext))
-                        ),
-                        map(lambda i: self._parse_entry(
-                            self.entry_reader.read(self._get_entry_size(), i * self._get_entry_size(), self.base_ptr)),
-                            range(int(self.size // self._get_entry_size())))
-                    )
-                )
+    def index(self):
+        return index_entries(list(self.scandir()))
+
+    def _parse_entry(self, data, ptr=0):
+        perms_offset, _, _ = self._get_entry_perms()
+
+        if data[ptr + perms_offset] == self.ENTRY_PERMS_LFN:
+            return self._get_lfn_codec().unpack(data, ptr)
+
+        return self._get_entry_codec().unpack(data, ptr)
+
+    def _join_lfn(self, records):
+        return b"".join(
+            b"".join((i.Name5, i.Name6, i.Name2)) for i in sorted(
+                filter(
+                    lambda i: i.SeqNumber != 0xE5 and i.SeqNumber <= 0x4F, map(self._parse_entry, records)
+                ),
+                key=lambda i: i.SeqNumber & 0x1F  # FIXME: Replace values to named constants
             )
-        )
+        ) or None
+
+    def _make_entry(self, record, lfn=None):
+        return self._get_entry_class()(self, bytes(record), lfn)
+
+    def _records(self):
+        entry_size = self._get_entry_size()
+        data = memoryview(self.entry_reader.read(self.size, 0, self.base_ptr))
+
+        if self.table.metrics is not None:
+            self.table.metrics.count("dir_slots", len(data) // entry_size)
+
+        return (data[ptr: ptr + entry_size] for ptr in range(0, len(data) - len(data) % entry_size, entry_size))
+
+    def __iter__(self):
+        # Records are grouped as the long name slots followed by their short entry, up to the first free record.
+        # Deleted entries are skipped together with their long name slots
+        perms_offset, _, _ = self._get_entry_perms()
+        ext_offset = self._get_entry_codec().offset("Ext")
+        lfn = []
+
+        for record in takewhile(lambda r: r[0] != 0 or r[ext_offset] != 0, self._records()):
+            if record[perms_offset] == self.ENTRY_PERMS_LFN:
+                lfn.append(record)
+                continue
+
+            if record[0] != self.ENTRY_DELETED:
+                yield self._make_entry(record, self._join_lfn(lfn) if lfn else None)
+
+            lfn = []
 
 
 class FATBootSector:
-    def __init__(self, reader):
-        self.data = self._get_struct_class()(
-            *(reader.unpack(unpack_str, size, offset)[0] for offset, size, _, unpack_str in self._get_sign())
-        )
+    SIZE = 512
 
-    @staticmethod
-    def _get_sign():
-        raise not_implemented()
+    def __init__(self, reader, data=None):
+        data = reader.read(self.SIZE) if data is None else data
+        self.data = self._get_codec().unpack(data)
 
     @staticmethod
-    def _get_struct_class():
+    def _get_codec():
         raise not_implemented()
 
     @property
@@ -337,27 +777,275 @@ class FATBootSector:
     def cluster_size(self):
         return self.data.BytesPerSector * self.data.SectorsPerCluster
 
+    @property
+    def total_size(self):
+        return (self.data.TotalSectors or self.data.TotalLogicalSectors) * self.data.BytesPerSector
+
+    @property
+    def clusters(self):
+        return (self.total_size - self.data_offset) // self.cluster_size
+
     @property
     def data_offset(self):
         return self.fats_offset + self.fats_copies * self.fat_size
 
 
 class FATReader:
-    def __init__(self, reader):
+    DIR_CACHE_SIZE = 16 * 1024 * 1024
+    EXTRACT_CHUNK_SIZE = 4 * 1024 * 1024
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, reader, preload_fat=False, dir_cache_size=DIR_CACHE_SIZE, catalog=None, boot_data=None,
+                 metrics=None):
         self.reader = reader
-        self.boot_sector = self.read_boot_sector()
-        self.fats = self.read_fats()
-        self.root_dir = self.read_root()
+        self.preload_fat = preload_fat
+        self.metrics = metrics
+        self.dir_cache = LRUCache(dir_cache_size, self._weigh_dir_listing)
+        # The cache is shared with the `walk` prefetch thread, directories themselves are read outside of the lock
+        self.dir_cache_lock = Lock()
+        self.catalog = catalog
+        self.catalog_synced = False
+        self.boot_sector = self.read_boot_sector(boot_data)
+        self._fats = None
+        self._root_dir = None
+
+    @property
+    def fats(self):
+        if self._fats is None:
+            self._fats = self.read_fats()
+
+        return self._fats
+
+    @property
+    def root_dir(self):
+        if self._root_dir is None:
+            self._root_dir = self.read_root()
+
+        return self._root_dir
+
+    @property
+    def volume_label(self):
+        return decode_sfn(self.boot_sector.data.VolumeLabel).strip()
+
+    @staticmethod
+    def _weigh_dir_listing(listing):
+        # Rough in-memory footprint of the entries (their records are copies) and both name tables
+        entries, by_name, by_short_name = listing
+        return sum(map(getsizeof, listing)) + sum(
+            getsizeof(e) + getsizeof(e.record) + getsizeof(e.lfn) for e in entries
+        ) + sum(map(getsizeof, chain(by_name, by_short_name)))
+
+    def _read_dir(self, entry):
+        if self.catalog is None:
+            with timer(self.metrics, "dir_list"):
+                return list((entry or self.root_dir).scandir())
 
-    def read_boot_sector(self):
-        return self._get_boot_sector_class()(self.reader)
+        if not self.catalog_synced:
+            self.catalog.sync(self)
+            self.catalog_synced = True
+
+        return self.catalog.entries(self, entry.cluster if entry else 0)
+
+    def _dir_listing(self, entry):
+        # Directories are keyed by first cluster and the root one by None, empty files have cluster 0 as well
+        entry = entry if isinstance(entry, FATEntry) else None
+
+        if entry and not entry.is_directory:
+            raise FATEntryNonDirectory("Could not enumerate file entry")
+
+        key = entry.cluster if entry else None
+
+        with self.dir_cache_lock:
+            listing = self.dir_cache.get(key)
+
+        if listing is None:
+            entries = self._read_dir(entry)
+
+            with self.dir_cache_lock:
+                listing = self.dir_cache.put(key, (entries, *index_entries(entries)))
+
+        return listing
+
+    def _lookup_child(self, entry, name):
+        _, by_name, by_short_name = self._dir_listing(entry)
+        child = by_name.get(name) or by_short_name.get(name.upper())
+
+        if child is None:
+            raise FATEntryNotFound("No such file or directory: '{}'".format(name))
+
+        return child
+
+    def scandir(self, path="/"):
+        entries, _, _ = self._dir_listing(self.lookup(path))
+        return iter(entries)
+
+    def lookup(self, path):
+        return reduce(self._lookup_child, split_path(path), None) or self.root_dir
+
+    def walk(self, top="/", prefetch=0):
+        # Breadth-first, every level is read in physical (first cluster) order. With `prefetch` > 0 up to that
+        # many directories are read ahead on a background thread, readers not safe for concurrent use read in place.
+        # Directories whose cluster was already listed (an entry looping back to an ancestor) are not entered
+        directory = self.lookup(top)
+        level = [("/" + "/".join(split_path(top)), directory)]
+        root_cluster = getattr(self.root_dir.entry_reader, "cluster", 0)
+        visited = {directory.cluster if isinstance(directory, FATEntry) else root_cluster}
+        prefetch = prefetch if self.reader.thread_safe else 0
+
+        def listing(item):
+            return self._dir_listing(item[1])[0]
+
+        with ThreadPoolExecutor(1) if prefetch > 0 else nullcontext() as pool:
+            while level:
+                next_level = []
+
+                for (path, directory), entries in prefetch_map(listing, level, pool, prefetch):
+                    dirs = [e for e in entries if e.is_directory]
+                    files = [e for e in entries if not e.is_directory]
+
+                    yield path, dirs, files
+
+                    for d in dirs:
+                        if d.cluster not in visited:
+                            visited.add(d.cluster)
+                            next_level.append((path.rstrip("/") + "/" + d.name, d))
+
+                level = sorted(next_level, key=lambda i: i[1].cluster)
+
+    def _plan_extract(self, dest_dir, paths):
+        dirs, files = [], []
+
+        for top in paths:
+            entry = self.lookup(top)
+
+            if isinstance(entry, FATEntry) and not entry.is_directory:
+                makedirs(join_path(dest_dir, *split_path(top)[:-1]), exist_ok=True)
+                files.append(("/".join(split_path(top)), entry))
+                continue
+
+            for path, sub_dirs, sub_files in self.walk(top):
+                makedirs(join_path(dest_dir, *split_path(path)), exist_ok=True)
+                dirs.extend((path.rstrip("/") + "/" + e.name, e) for e in sub_dirs)
+                files.extend((path.rstrip("/") + "/" + e.name, e) for e in sub_files)
+
+        return dirs, [(join_path(dest_dir, *split_path(path)), entry) for path, entry in files]
+
+    def extract(self, dest_dir, paths=None, workers=4):
+        # Copies files with their directory structure and DOS timestamps. Every extent piece of every file is
+        # planned first and the pieces are copied in physical order by a thread pool, each through its own handle.
+        # Reads are serialized unless the reader is thread safe.
+        dirs, files = self._plan_extract(dest_dir, paths or ["/"])
+        lock = nullcontext() if self.reader.thread_safe else Lock()
+
+        for host_path, _ in files:
+            with open(host_path, "wb"):
+                pass
+
+        jobs = sorted(
+            (ptr + chunk, min(length - chunk, self.EXTRACT_CHUNK_SIZE), entry.data_ptr, host_path, offset + chunk)
+            for host_path, entry in files
+            for offset, ptr, length in entry.entry_reader.layout(0, entry.size)
+            for chunk in range(0, length, self.EXTRACT_CHUNK_SIZE)
+        )
+
+        def copy(job):
+            ptr, length, data_ptr, host_path, offset = job
+
+            with lock:
+                data = self.reader.read(length, ptr, data_ptr)
+
+            with open(host_path, "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+
+        with ThreadPoolExecutor(max(workers, 1)) as pool:
+            list(pool.map(copy, jobs))
+
+        for host_path, entry in chain(files, (
+                (join_path(dest_dir, *split_path(path)), entry) for path, entry in reversed(dirs)
+        )):
+            times = (entry.accessed or entry.modified, entry.modified)
+
+            if all(times):
+                utime(host_path, tuple(t.timestamp() for t in times))
+
+        return [host_path for host_path, _ in files]
+
+    def hash_key(self, entry, algorithm="sha256"):
+        # Files of a volume with the same extents and size have the same content, so their digest can be reused
+        return "{:08X}:{}:{}:{}".format(
+            self.boot_sector.data.VolumeID,
+            algorithm,
+            entry.size,
+            ",".join("{}+{}".format(start, length) for start, length in entry.extents)
+        )
+
+    def hash_tree(self, algorithm="sha256", workers=4, top="/", cache=None):
+        # {path: hex digest} of every file under `top`, see `hash_files`
+        return self.hash_files(
+            ((path.rstrip("/") + "/" + entry.name, entry) for path, _, entries in self.walk(top) for entry in entries),
+            algorithm, workers, cache
+        )
+
+    def hash_files(self, files, algorithm="sha256", workers=4, cache=None):
+        # {path: hex digest} of (path, entry) pairs. Extents are resolved up front, then files are streamed through
+        # the hasher in chunks on a thread pool in physical order of their first cluster; hashing and positional
+        # reads release the GIL. Reads are serialized unless the reader is thread safe. `cache` is any mapping
+        # (a dict, a `shelve`) of digests by `hash_key`, files found there are not read at all.
+        lock = nullcontext() if self.reader.thread_safe else Lock()
+        files = sorted(files, key=lambda item: item[1].cluster)
+        digests, jobs = {}, []
+
+        for path, entry in files:
+            key = self.hash_key(entry, algorithm) if cache is not None else None
+
+            if key is not None and key in cache:
+                digests[path] = cache[key]
+                continue
+
+            jobs.append((path, key, entry.data_ptr, list(entry.entry_reader.layout(0, entry.size))))
+
+        def digest(job):
+            _, _, data_ptr, layout = job
+            content = new_hash(algorithm)
+
+            for _, ptr, length in layout:
+                for chunk in range(0, length, self.HASH_CHUNK_SIZE):
+                    with lock:
+                        data = self.reader.read(min(length - chunk, self.HASH_CHUNK_SIZE), ptr + chunk, data_ptr)
+
+                    content.update(data)
+
+            return content.hexdigest()
+
+        with ThreadPoolExecutor(max(workers, 1)) as pool:
+            for (path, key, _, _), value in zip(jobs, pool.map(digest, jobs)):
+                digests[path] = value
+
+                if key is not None:
+                    cache[key] = value
+
+        return {path: digests[path] for path, _ in files}
+
+    def open(self, path, buffering=DEFAULT_BUFFER_SIZE, read_ahead=0, executor=None):
+        entry = self.lookup(path)
+
+        if entry is self.root_dir:
+            raise FATEntryNonFile("Could not read directory as a file")
+
+        return entry.open(buffering, read_ahead, executor)
+
+    def read_boot_sector(self, data=None):
+        return self._get_boot_sector_class()(self.reader, data)
 
     def read_fats(self):
         return [
             self._get_fat_table_class()(
                 self.reader,
                 self.boot_sector.fats_offset + i * self.boot_sector.fat_size,
-                self.boot_sector.fat_size
+                self.boot_sector.fat_size,
+                self.preload_fat,
+                self.metrics
             ) for i in range(self.boot_sector.fats_copies)
         ]
 
@@ -368,6 +1056,34 @@ class FATReader:
     def primary_fat(self):
         return self.fats[0]
 
+    @property
+    def allocation_bitmap(self):
+        # Bit `cluster % 8` of byte `cluster // 8` is set for allocated clusters, the two reserved ones included
+        return self.primary_fat.allocation(self.boot_sector.clusters).bitmap
+
+    def statvfs(self):
+        allocation = self.primary_fat.allocation(self.boot_sector.clusters)
+
+        return FATStat(
+            self.boot_sector.cluster_size,
+            allocation.clusters,
+            allocation.free,
+            allocation.clusters - allocation.free - allocation.bad,
+            allocation.bad,
+            allocation.largest_free_run
+        )
+
+    def fragmentation(self):
+        # Fragments (contiguous runs) per cluster chain, one chain per non-empty file or directory
+        histogram = self.primary_fat.allocation(self.boot_sector.clusters).chain_fragments
+
+        return FATFragmentation(
+            sum(histogram.values()),
+            sum(count for fragments, count in histogram.items() if fragments > 1),
+            sum(fragments * count for fragments, count in histogram.items()),
+            dict(sorted(histogram.items()))
+        )
+
     @staticmethod
     def _get_boot_sector_class():
         raise not_implemented()
@@ -1,38 +1,63 @@
-from collections import namedtuple
+from array import array
 
-from .fat import FATTable, FATEntryReader, FATReader, FATEntry, FATDir, FATBootSector
+from codec import Codec
+
+from .fat import FATIndexOutOfBounds, FATTable, FATEntryReader, FATReader, FATEntry, FATDir, FATBootSector
 from .signatures import *
 
-FAT12_STRUCT = namedtuple("FAT12", (it[2] for it in FAT12_SIGN))
-FAT12_ENTRY_STRUCT = namedtuple("FAT12Directory", (it[2] for it in FAT12_ENTRY))
-FAT12_LFN_STRUCT = namedtuple("FAT12LFN", (it[2] for it in FAT12_LFN))
+FAT12_CODEC = Codec("FAT12", FAT12_SIGN)
+FAT12_ENTRY_CODEC = Codec("FAT12Directory", FAT12_ENTRY)
+FAT12_LFN_CODEC = Codec("FAT12LFN", FAT12_LFN)
+
+FAT12_STRUCT = FAT12_CODEC.tuple
+FAT12_ENTRY_STRUCT = FAT12_ENTRY_CODEC.tuple
+FAT12_LFN_STRUCT = FAT12_LFN_CODEC.tuple
 
 
 class FAT12Table(FATTable):
     FAT12_ENTRY_START = 0x002
     FAT12_ENTRY_END = 0xFEF
+    FAT12_BAD_CLUSTER = 0xFF7
 
     def _get(self, idx):
         return (int.from_bytes(
-            self.reader.read(2, int(idx * 1.5), self.base_ptr),
+            self.reader.read(2, idx * 3 // 2, self.base_ptr),
             "little"
         ) >> (0 if (idx % 2 == 0) else 4)) & 0xFFF
 
+    def __len__(self):
+        return self.size * 2 // 3
+
     def _validate_idx(self, idx):
-        if idx * 1.5 > self.size:
-            # TODO: Make OutOfBoundsException
-            raise Exception("Out of bounds")
+        if idx * 3 // 2 > self.size:
+            raise FATIndexOutOfBounds("Out of bounds")
+
+    def _decode(self, data):
+        # Every 3 bytes pack two 12-bit entries: even = lo | (mid & 0xF) << 8, odd = mid >> 4 | hi << 4
+        count = len(data) * 2 // 3
+        lo, mid, hi = (bytes(data[i::3]) for i in range(3))
+
+        table = array("H", bytes(count * 2))
+        table[0::2] = array("H", map(lambda l, m: l | (m & 0xF) << 8, lo[:(count + 1) // 2], mid))
+        table[1::2] = array("H", map(lambda m, h: m >> 4 | h << 4, mid[:count // 2], hi))
+
+        return table
 
     def _is_eof(self, val):
         # FIXME: Use DeMorgan rule
         return not (self.FAT12_ENTRY_START <= val <= self.FAT12_ENTRY_END)
 
+    def _get_bad_cluster(self):
+        return self.FAT12_BAD_CLUSTER
+
 
 class FAT12EntryReader(FATEntryReader):
     pass
 
 
 class FAT12Entry(FATEntry):
+    __slots__ = ()
+
     @staticmethod
     def _get_entry_reader_class():
         return FAT12EntryReader
@@ -47,29 +72,21 @@ class FAT12Dir(FATDir):
     def _get_entry_perms():
         return FAT12_ENTRY_PERMS
 
-    @staticmethod
-    def _get_lfn():
-        return FAT12_LFN
-
-    @staticmethod
-    def _get_entry():
-        return FAT12_ENTRY
-
     @staticmethod
     def _get_entry_class():
         return FAT12Entry
 
     @staticmethod
-    def _get_lfn_struct():
-        return FAT12_LFN_STRUCT
+    def _get_entry_size():
+        return FAT12_ENTRY_SIZE
 
     @staticmethod
-    def _get_entry_struct():
-        return FAT12_ENTRY_STRUCT
+    def _get_lfn_codec():
+        return FAT12_LFN_CODEC
 
     @staticmethod
-    def _get_entry_size():
-        return FAT12_ENTRY_SIZE
+    def _get_entry_codec():
+        return FAT12_ENTRY_CODEC
 
 
 class FAT12BootSector(FATBootSector):
@@ -90,12 +107,8 @@ class FAT12BootSector(FATBootSector):
         return super().data_offset + self.root_size
 
     @staticmethod
-    def _get_sign():
-        return FAT12_SIGN
-
-    @staticmethod
-    def _get_struct_class():
-        return FAT12_STRUCT
+    def _get_codec():
+        return FAT12_CODEC
 
 
 class FAT12Reader(FATReader):
@@ -1,38 +1,55 @@
-from collections import namedtuple
+from codec import Codec
 
-from .fat import FATTable, FATEntryReader, FATReader, FATEntry, FATDir, FATBootSector
+from .fat import (
+    decode_le_array, FATIndexOutOfBounds, FATTable, FATEntryReader, FATReader, FATEntry, FATDir, FATBootSector
+)
 from .signatures import *
 
-FAT16_STRUCT = namedtuple("FAT16", (it[2] for it in FAT16_SIGN))
-FAT16_ENTRY_STRUCT = namedtuple("FAT16Directory", (it[2] for it in FAT16_ENTRY))
-FAT16_LFN_STRUCT = namedtuple("FAT16LFN", (it[2] for it in FAT16_LFN))
+FAT16_CODEC = Codec("FAT16", FAT16_SIGN)
+FAT16_ENTRY_CODEC = Codec("FAT16Directory", FAT16_ENTRY)
+FAT16_LFN_CODEC = Codec("FAT16LFN", FAT16_LFN)
+
+FAT16_STRUCT = FAT16_CODEC.tuple
+FAT16_ENTRY_STRUCT = FAT16_ENTRY_CODEC.tuple
+FAT16_LFN_STRUCT = FAT16_LFN_CODEC.tuple
 
 
 class FAT16Table(FATTable):
     FAT16_ENTRY_START = 0x0002
     FAT16_ENTRY_END = 0xFFEF
+    FAT16_BAD_CLUSTER = 0xFFF7
 
     def _get(self, idx):
         return int.from_bytes(
-            self.reader.read(4, idx * 2, self.base_ptr),
+            self.reader.read(2, idx * 2, self.base_ptr),
             "little"
         )
 
+    def __len__(self):
+        return self.size // 2
+
     def _validate_idx(self, idx):
-        if idx * 4 > self.size:
-            # TODO: Make OutOfBoundsException
-            raise Exception("Out of bounds")
+        if idx * 2 > self.size:
+            raise FATIndexOutOfBounds("Out of bounds")
+
+    def _decode(self, data):
+        return decode_le_array("H", data)
 
     def _is_eof(self, val):
         # FIXME: Use DeMorgan rule
         return not (self.FAT16_ENTRY_START <= val <= self.FAT16_ENTRY_END)
 
+    def _get_bad_cluster(self):
+        return self.FAT16_BAD_CLUSTER
+
 
 class FAT16EntryReader(FATEntryReader):
     pass
 
 
 class FAT16Entry(FATEntry):
+    __slots__ = ()
+
     @staticmethod
     def _get_entry_reader_class():
         return FAT16EntryReader
@@ -47,29 +64,21 @@ class FAT16Dir(FATDir):
     def _get_entry_perms():
         return FAT16_ENTRY_PERMS
 
-    @staticmethod
-    def _get_lfn():
-        return FAT16_LFN
-
-    @staticmethod
-    def _get_entry():
-        return FAT16_ENTRY
-
     @staticmethod
     def _get_entry_class():
         return FAT16Entry
 
     @staticmethod
-    def _get_lfn_struct():
-        return FAT16_LFN_STRUCT
+    def _get_entry_size():
+        return FAT16_ENTRY_SIZE
 
     @staticmethod
-    def _get_entry_struct():
-        return FAT16_ENTRY_STRUCT
+    def _get_lfn_codec():
+        return FAT16_LFN_CODEC
 
     @staticmethod
-    def _get_entry_size():
-        return FAT16_ENTRY_SIZE
+    def _get_entry_codec():
+        return FAT16_ENTRY_CODEC
 
 
 class FAT16BootSector(FATBootSector):
@@ -90,12 +99,8 @@ class FAT16BootSector(FATBootSector):
         return super().data_offset + self.root_size  # FIXME: Same as in FAT12
 
     @staticmethod
-    def _get_sign():
-        return FAT16_SIGN
-
-    @staticmethod
-    def _get_struct_class():
-        return FAT16_STRUCT
+    def _get_codec():
+        return FAT16_CODEC
 
 
 class FAT16Reader(FATReader):
@@ -1,38 +1,61 @@
-from collections import namedtuple
+from codec import Codec
 
-from .fat import FATTable, FATEntryReader, FATReader, FATEntry, FATDir, FATBootSector
+from .fat import (
+    decode_le_array, FATIndexOutOfBounds, FATTable, FATEntryReader, FATReader, FATEntry, FATDir, FATBootSector
+)
 from .signatures import *
 
-FAT32_STRUCT = namedtuple("FAT32", (it[2] for it in FAT32_SIGN))
-FAT32_ENTRY_STRUCT = namedtuple("FAT32Directory", (it[2] for it in FAT32_ENTRY))
-FAT32_LFN_STRUCT = namedtuple("FAT32LFN", (it[2] for it in FAT32_LFN))
+FAT32_CODEC = Codec("FAT32", FAT32_SIGN)
+FAT32_ENTRY_CODEC = Codec("FAT32Directory", FAT32_ENTRY)
+FAT32_LFN_CODEC = Codec("FAT32LFN", FAT32_LFN)
+
+FAT32_STRUCT = FAT32_CODEC.tuple
+FAT32_ENTRY_STRUCT = FAT32_ENTRY_CODEC.tuple
+FAT32_LFN_STRUCT = FAT32_LFN_CODEC.tuple
+
+FAT32_HIGH_BYTE_MASK = bytes(i & 0x0F for i in range(256))
 
 
 class FAT32Table(FATTable):
     FAT32_ENTRY_START = 0x00000002
     FAT32_ENTRY_END = 0x0FFFFFEF
+    FAT32_BAD_CLUSTER = 0x0FFFFFF7
+    FAT32_ENTRY_MASK = 0x0FFFFFFF  # upper 4 bits are reserved
 
     def _get(self, idx):
         return int.from_bytes(
             self.reader.read(4, idx * 4, self.base_ptr),
             "little"
-        )
+        ) & self.FAT32_ENTRY_MASK
+
+    def __len__(self):
+        return self.size // 4
 
     def _validate_idx(self, idx):
         if idx * 4 > self.size:
-            # TODO: Make OutOfBoundsException
-            raise Exception("Out of bounds")
+            raise FATIndexOutOfBounds("Out of bounds")
+
+    def _decode(self, data):
+        # Reserved bits are the high nibble of every 4th byte, cleared for the whole table with one translate
+        data = bytearray(data[:len(data) - len(data) % 4])
+        data[3::4] = bytes(data[3::4]).translate(FAT32_HIGH_BYTE_MASK)
+        return decode_le_array("I", data)
 
     def _is_eof(self, val):
         # FIXME: Use DeMorgan rule
         return not (self.FAT32_ENTRY_START <= val <= self.FAT32_ENTRY_END)
 
+    def _get_bad_cluster(self):
+        return self.FAT32_BAD_CLUSTER
+
 
 class FAT32EntryReader(FATEntryReader):
     pass
 
 
 class FAT32Entry(FATEntry):
+    __slots__ = ()
+
     @staticmethod
     def _get_entry_reader_class():
         return FAT32EntryReader
@@ -47,29 +70,21 @@ class FAT32Dir(FATDir):
     def _get_entry_perms():
         return FAT32_ENTRY_PERMS
 
-    @staticmethod
-    def _get_lfn():
-        return FAT32_LFN
-
-    @staticmethod
-    def _get_entry():
-        return FAT32_ENTRY
-
     @staticmethod
     def _get_entry_class():
         return FAT32Entry
 
     @staticmethod
-    def _get_lfn_struct():
-        return FAT32_LFN_STRUCT
+    def _get_entry_size():
+        return FAT32_ENTRY_SIZE
 
     @staticmethod
-    def _get_entry_struct():
-        return FAT32_ENTRY_STRUCT
+    def _get_lfn_codec():
+        return FAT32_LFN_CODEC
 
     @staticmethod
-    def _get_entry_size():
-        return FAT32_ENTRY_SIZE
+    def _get_entry_codec():
+        return FAT32_ENTRY_CODEC
 
 
 class FAT32BootSector(FATBootSector):
@@ -78,12 +93,8 @@ class FAT32BootSector(FATBootSector):
         return self.data.RootCluster
 
     @staticmethod
-    def _get_sign():
-        return FAT32_SIGN
-
-    @staticmethod
-    def _get_struct_class():
-        return FAT32_STRUCT
+    def _get_codec():
+        return FAT32_CODEC
 
 
 class FAT32Reader(FATReader):
@@ -100,7 +111,7 @@ class FAT32Reader(FATReader):
             self.reader,
             root_reader,
             0,
-            root_reader.size(),
+            None,
             self.boot_sector.cluster_size,
             self.boot_sector.data_offset
         )
@@ -0,0 +1,296 @@
+from datetime import datetime, timedelta
+from random import Random
+
+from .fat import sfn_checksum
+from .fat12 import FAT12_CODEC, FAT12_ENTRY_CODEC, FAT12_LFN_CODEC
+from .fat32 import FAT32_CODEC
+from .volume import fat_type, FAT12_MAX_CLUSTERS, FAT16_MAX_CLUSTERS
+
+# Deterministic synthetic FAT12/16/32 images for tests and benchmarks. A tree is a dict mapping names to either file
+# contents (bytes) or nested dicts (directories).
+
+SECTOR_SIZE = 512
+ENTRY_SIZE = FAT12_ENTRY_CODEC.size
+LFN_CHARS = 13
+
+FAT_EOC = {12: 0xFFF, 16: 0xFFFF, 32: 0x0FFFFFFF}
+FAT_MEDIA = {12: 0xFF8, 16: 0xFFF8, 32: 0x0FFFFFF8}
+FAT_FSTYPE = {12: b"FAT12   ", 16: b"FAT16   ", 32: b"FAT32   "}
+
+DOS_PERMS_D = 0x10
+DOS_PERMS_A = 0x20
+DOS_PERMS_LFN = 0x0F
+LFN_LAST = 0x40
+
+SFN_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-")
+EPOCH = datetime(2020, 1, 1)
+
+
+def encode_dos_datetime(dt):
+    return (dt.year - 1980) << 9 | dt.month << 5 | dt.day, dt.hour << 11 | dt.minute << 5 | dt.second // 2
+
+
+class FATImageBuilder:
+    def __init__(self, fat, total_sectors, sectors_per_cluster=1, root_entries=512, fragmentation=0.0, seed=0):
+        self.fat = fat
+        self.total_sectors = total_sectors
+        self.sectors_per_cluster = sectors_per_cluster
+        self.cluster_size = sectors_per_cluster * SECTOR_SIZE
+        self.reserved_sectors = 32 if fat == 32 else 1
+        self.fat_copies = 2
+        self.root_entries = 0 if fat == 32 else root_entries
+        self.root_sectors = (self.root_entries * ENTRY_SIZE + SECTOR_SIZE - 1) // SECTOR_SIZE
+        self.fat_sectors, self.clusters = self._layout()
+
+        self.data_sector = self.reserved_sectors + self.fat_copies * self.fat_sectors + self.root_sectors
+        self.table = [FAT_MEDIA[fat], FAT_EOC[fat]] + [0] * self.clusters
+        self.image = bytearray(total_sectors * SECTOR_SIZE)
+        self.random = Random(seed)
+        self.fragmentation = fragmentation
+        self.free = self.clusters
+        self.cursor = 2
+        self.stamp = 0
+        self.root_cluster = 0
+
+    def _layout(self):
+        # Smallest FAT that still covers every cluster left after it
+        fat_sectors = 1
+
+        while True:
+            clusters = (
+                self.total_sectors - self.reserved_sectors - self.fat_copies * fat_sectors - self.root_sectors
+            ) // self.sectors_per_cluster
+            needed = ((clusters + 2) * self.fat // 8 + SECTOR_SIZE) // SECTOR_SIZE
+
+            if needed <= fat_sectors:
+                break
+
+            fat_sectors = needed
+
+        low, high = {12: (0, FAT12_MAX_CLUSTERS), 16: (FAT12_MAX_CLUSTERS, FAT16_MAX_CLUSTERS)}.get(
+            self.fat, (FAT16_MAX_CLUSTERS, 0x0FFFFFF5)
+        )
+
+        if not low <= clusters < high:
+            raise ValueError("{} clusters do not make a FAT{} volume".format(clusters, self.fat))
+
+        return fat_sectors, clusters
+
+    def allocate(self, count):
+        # Next free clusters from a rotating cursor, `fragmentation` is the chance to leave a gap before each one
+        if count > self.free:
+            raise ValueError("Volume is full")
+
+        chain = []
+
+        while len(chain) < count:
+            if self.cursor >= self.clusters + 2:
+                self.cursor = 2
+
+            if self.fragmentation and self.free - count > 8 and self.random.random() < self.fragmentation:
+                self.cursor += self.random.randint(1, 8)
+                continue
+
+            if not self.table[self.cursor]:
+                chain.append(self.cursor)
+                self.table[self.cursor] = FAT_EOC[self.fat]
+
+            self.cursor += 1
+
+        for cluster, next_cluster in zip(chain, chain[1:]):
+            self.table[cluster] = next_cluster
+
+        self.free -= count
+        return chain
+
+    def _write_chain(self, chain, data):
+        for i, cluster in enumerate(chain):
+            ptr = self.data_sector * SECTOR_SIZE + (cluster - 2) * self.cluster_size
+            chunk = data[i * self.cluster_size: (i + 1) * self.cluster_size]
+            self.image[ptr: ptr + len(chunk)] = chunk
+
+    def _next_stamp(self):
+        self.stamp += 1
+        return encode_dos_datetime(EPOCH + timedelta(minutes=self.stamp * 7, seconds=self.stamp * 2))
+
+    @staticmethod
+    def _short_name(name, used):
+        # Valid upper-case 8.3 names are kept as they are, anything else gets a numeric tail and a long name
+        base, ext = name.rsplit(".", 1) if "." in name[1:] else (name, "")
+
+        if 0 < len(base) <= 8 and len(ext) <= 3 and set(base + ext) <= SFN_CHARS:
+            sfn = (base.ljust(8) + ext.ljust(3)).encode("ascii")
+
+            if sfn not in used:
+                used[sfn] = 0
+                return sfn, False
+
+        base = "".join(c for c in base.upper() if c in SFN_CHARS)[:6] or "FILE"
+        ext = "".join(c for c in ext.upper() if c in SFN_CHARS)[:3]
+
+        while True:
+            used[base] = used.get(base, 0) + 1
+            tail = "~{}".format(used[base])
+            sfn = (base[:8 - len(tail)] + tail).ljust(8).encode("ascii") + ext.ljust(3).encode("ascii")
+
+            if sfn not in used:
+                used[sfn] = 0
+                return sfn, True
+
+    def _record(self, sfn, perms, cluster, size):
+        date, time = self._next_stamp()
+
+        return FAT12_ENTRY_CODEC.pack(FAT12_ENTRY_CODEC.tuple(
+            sfn[:8], sfn[8:], perms, 0, 0, time, date, date, cluster >> 16, time, date, cluster & 0xFFFF, size
+        ))
+
+    @staticmethod
+    def _lfn_records(name, sfn):
+        data = name.encode("utf-16-le")
+        data += b"\x00\x00" if len(data) % (LFN_CHARS * 2) else b""
+        data += b"\xFF" * (-len(data) % (LFN_CHARS * 2))
+        parts = [data[i: i + LFN_CHARS * 2] for i in range(0, len(data), LFN_CHARS * 2)]
+        checksum = sfn_checksum(sfn)
+
+        return [
+            FAT12_LFN_CODEC.pack(FAT12_LFN_CODEC.tuple(
+                seq | (LFN_LAST if seq == len(parts) else 0), parts[seq - 1][:10], DOS_PERMS_LFN, 0, checksum,
+                parts[seq - 1][10:22], 0, parts[seq - 1][22:]
+            ))
+            for seq in range(len(parts), 0, -1)
+        ]
+
+    def _records(self, items, cluster=None, parent_cluster=0):
+        records, used = [], {}
+
+        if cluster is not None:
+            records.append(self._record(b".          ", DOS_PERMS_D, cluster, 0))
+            records.append(self._record(b"..         ", DOS_PERMS_D, parent_cluster, 0))
+
+        for name, perms, first_cluster, size in items:
+            sfn, lfn = self._short_name(name, used)
+            records.extend(self._lfn_records(name, sfn) if lfn else ())
+            records.append(self._record(sfn, perms, first_cluster, size))
+
+        return records
+
+    def add_tree(self, tree, parent_cluster=0, root=True):
+        # Directory size is known up front from its names, children are allocated after their parent
+        slots = len(self._records(((name, 0, 0, 0) for name in tree), None if root else 0))
+        self.stamp -= slots
+
+        if root and self.fat != 32:
+            if slots > self.root_entries:
+                raise ValueError("Root directory is full")
+
+            chain, cluster = None, 0
+        else:
+            chain = self.allocate(max(1, -(-slots * ENTRY_SIZE // self.cluster_size)))
+            cluster = chain[0]
+
+        items = []
+
+        for name, node in tree.items():
+            if isinstance(node, dict):
+                items.append((name, DOS_PERMS_D, self.add_tree(node, 0 if root else cluster, False), 0))
+                continue
+
+            node_chain = self.allocate(-(-len(node) // self.cluster_size)) if node else []
+            self._write_chain(node_chain, node)
+            items.append((name, DOS_PERMS_A, node_chain[0] if node_chain else 0, len(node)))
+
+        data = b"".join(self._records(items, None if root else cluster, parent_cluster))
+
+        if chain is None:
+            ptr = (self.reserved_sectors + self.fat_copies * self.fat_sectors) * SECTOR_SIZE
+            self.image[ptr: ptr + len(data)] = data
+        else:
+            self._write_chain(chain, data)
+
+        if root:
+            self.root_cluster = cluster
+
+        return cluster
+
+    def _boot_sector(self, label, volume_id):
+        fields = dict(
+            JumpInstruction=b"\xEB\x3C\x90",
+            OemID=b"PYDISK  ",
+            BytesPerSector=SECTOR_SIZE,
+            SectorsPerCluster=self.sectors_per_cluster,
+            SectorsCount=self.reserved_sectors,
+            FATCopies=self.fat_copies,
+            MaxRootEntries=self.root_entries,
+            TotalSectors=self.total_sectors if self.total_sectors < 0x10000 and self.fat != 32 else 0,
+            MediaDescriptor=0xF8,
+            SectorsPerTrack=63,
+            Heads=255,
+            TotalLogicalSectors=self.total_sectors if self.total_sectors >= 0x10000 or self.fat == 32 else 0,
+            PhysDriveNumber=0x80,
+            VolumeID=volume_id,
+            VolumeLabel=label.upper().ljust(11)[:11].encode("ascii"),
+            FSType=FAT_FSTYPE[self.fat],
+            BootSignature=0xAA55
+        )
+
+        if self.fat == 32:
+            codec = FAT32_CODEC
+            fields.update(SectorsPerFAT=self.fat_sectors, RootCluster=self.root_cluster, FSISector=1,
+                          BootCopySector=6, ExtBootSignature=0x29)
+        else:
+            codec = FAT12_CODEC
+            fields.update(SectorsPerFAT=self.fat_sectors, Signature=0x29)
+
+        return codec.pack(codec.tuple(**dict(dict.fromkeys(codec.tuple._fields, 0), **fields)))
+
+    def _encode_table(self):
+        if self.fat == 12:
+            data = bytearray((len(self.table) * 3 + 1) // 2 + 1)
+
+            for i in range(0, len(self.table), 2):
+                pair = self.table[i] | (self.table[i + 1] if i + 1 < len(self.table) else 0) << 12
+                data[i * 3 // 2: i * 3 // 2 + 3] = pair.to_bytes(3, "little")
+
+            return bytes(data[:(len(self.table) * 3 + 1) // 2])
+
+        return b"".join(v.to_bytes(self.fat // 8, "little") for v in self.table)
+
+    def build(self, label="PYDISK", volume_id=0x12345678):
+        self.image[:SECTOR_SIZE] = self._boot_sector(label, volume_id)
+        table = self._encode_table()
+
+        for i in range(self.fat_copies):
+            ptr = (self.reserved_sectors + i * self.fat_sectors) * SECTOR_SIZE
+            self.image[ptr: ptr + len(table)] = table
+
+        if fat_type(self.image[:SECTOR_SIZE]) != self.fat:
+            raise ValueError("Built volume is not detected as FAT{}".format(self.fat))
+
+        return bytes(self.image)
+
+
+def build_image(fat, tree, total_sectors, sectors_per_cluster=1, root_entries=512, fragmentation=0.0, seed=0,
+                label="PYDISK", volume_id=0x12345678):
+    builder = FATImageBuilder(fat, total_sectors, sectors_per_cluster, root_entries, fragmentation, seed)
+    builder.add_tree(tree)
+    return builder.build(label, volume_id)
+
+
+def random_tree(seed=0, depth=2, fanout=3, files=10, lfn_density=0.5, size=lambda r: r.randint(0, 4096)):
+    # `fanout` subdirectories and `files` files per directory down to `depth` levels. `lfn_density` is the share of
+    # names that need a long name entry, `size` draws a file size from the given Random.
+    rnd = Random(seed)
+
+    def name(kind, i):
+        return "{} number {} of {}.txt".format(kind, i, rnd.randint(0, 999)) if rnd.random() < lfn_density \
+            else "{}{:05d}.TXT".format(kind[:3].upper(), i)
+
+    def level(d):
+        tree = {name("file", i): rnd.randbytes(size(rnd)) for i in range(files)}
+
+        if d < depth:
+            tree.update((name("dir", i).rsplit(".", 1)[0], level(d + 1)) for i in range(fanout))
+
+        return tree
+
+    return level(0)
@@ -0,0 +1,131 @@
+from collections import namedtuple
+from re import finditer
+
+from .fat import FATEntryReader, decode_dos_datetime, decode_lfn, decode_sfn, sfn_checksum
+
+FATDeletedEntry = namedtuple("FATDeletedEntry", "ptr name short_name is_directory cluster size modified free")
+FATFreeRun = namedtuple("FATFreeRun", "cluster count")
+
+SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+DOS_PERMS_VOLUME = 0x08
+DOS_PERMS_DIRECTORY = 0x10
+DOS_PERMS_INVALID = 0xC0
+SFN_CASE_FLAGS = 0x18
+SFN_INVALID_CHARS = frozenset(b'"*+,./:;<=>?[\\]|')
+SFN_PLACEHOLDER = b"_"
+
+
+def _valid_date(date):
+    return date == 0 or decode_dos_datetime(date) is not None
+
+
+def _is_deleted_record(record, clusters):
+    # Plausibility of a deleted short entry found in a block of raw data
+    perms, cluster = record.DOSPerms, record.ClusterHi << 16 | record.ClusterLo
+
+    return (
+        not perms & (DOS_PERMS_INVALID | DOS_PERMS_VOLUME)
+        and not record.Flags & ~SFN_CASE_FLAGS
+        and all(c >= 0x20 and c not in SFN_INVALID_CHARS for c in record.Name[1:] + record.Ext)
+        and record.MDate != 0 and all(map(_valid_date, (record.MDate, record.CDate, record.ADate)))
+        and (cluster == 0 or 2 <= cluster < clusters + 2)
+    )
+
+
+def _deleted_lfn(volume, block, ptr, name):
+    # Long name slots are stored in reverse order right before their short entry. Deleted slots lose their sequence
+    # number, so they are taken backwards while they carry the checksum of `name` (with a guessed first character)
+    codec, entry_size = volume.root_dir._get_lfn_codec(), volume.root_dir._get_entry_size()
+    parts, checksum = [], None
+
+    while ptr >= entry_size:
+        ptr -= entry_size
+        slot = codec.unpack(block, ptr)
+
+        if (
+                slot.SeqNumber != volume.root_dir.ENTRY_DELETED or slot.DOSPerms != volume.root_dir.ENTRY_PERMS_LFN
+                or slot.ClusterLo != 0 or checksum not in (None, slot.Checksum)
+        ):
+            break
+
+        checksum = slot.Checksum
+        parts.append(slot.Name5 + slot.Name6 + slot.Name2)
+
+    if not parts:
+        return None, name
+
+    lfn = decode_lfn(b"".join(parts))
+    first = next((
+        c for c in sorted(range(0x20, 0x7F), key=lambda c: c != ord(lfn[:1].upper() or " "))
+        if sfn_checksum(bytes([c]) + name[1:]) == checksum
+    ), None)
+
+    return lfn, name if first is None else bytes([first]) + name[1:]
+
+
+def _deleted_entries(volume, block, base_ptr, clusters, used):
+    # Candidate records are the 32 byte slots starting with the deleted marker, found over one strided copy of the
+    # first byte of every slot in the block
+    directory = volume.root_dir
+    codec, entry_size = directory._get_entry_codec(), directory._get_entry_size()
+    first_bytes = bytes(block[0::entry_size])
+
+    for match in finditer(bytes([directory.ENTRY_DELETED]), first_bytes):
+        ptr = match.start() * entry_size
+
+        if ptr + entry_size > len(block) or block[ptr + codec.offset("DOSPerms")] == directory.ENTRY_PERMS_LFN:
+            continue
+
+        record = codec.unpack(block, ptr)
+
+        if not _is_deleted_record(record, clusters):
+            continue
+
+        name = SFN_PLACEHOLDER + record.Name[1:] + record.Ext
+        lfn, name = _deleted_lfn(volume, block, ptr, name)
+        short_name = ".".join(filter(None, (decode_sfn(name[:8]).strip(), decode_sfn(name[8:]).strip())))
+        cluster = record.ClusterHi << 16 | record.ClusterLo
+
+        yield FATDeletedEntry(
+            base_ptr + ptr,
+            lfn or short_name,
+            short_name,
+            bool(record.DOSPerms & DOS_PERMS_DIRECTORY),
+            cluster,
+            record.FileSize,
+            decode_dos_datetime(record.MDate, record.MTime),
+            bool(cluster) and used[cluster - 2] == 0
+        )
+
+
+def scan_volume(volume, block_size=SCAN_BLOCK_SIZE):
+    # One sequential pass over the root directory region and the data area in `block_size` reads. Yields every
+    # plausible deleted directory entry (`FATDeletedEntry`, `ptr` is its volume offset) and, from the in-memory
+    # FAT, every run of unallocated clusters (`FATFreeRun`) in physical order. Data clusters are checked in
+    # place of directory chains, so entries of deleted directories are found as well.
+    boot_sector, table = volume.boot_sector, volume.primary_fat
+    cluster_size, data_offset = boot_sector.cluster_size, boot_sector.data_offset
+    _, used, _, _ = table.runs(boot_sector.clusters)
+    clusters = len(used)
+
+    if not isinstance(volume.root_dir.entry_reader, FATEntryReader):
+        # FAT12/16 root directory region right before the data area
+        root_ptr = volume.root_dir.base_ptr
+        yield from _deleted_entries(
+            volume, volume.reader.read(volume.root_dir.size, 0, root_ptr), root_ptr, clusters, used
+        )
+
+    free_runs = ((m.start(), m.end() - m.start()) for m in finditer(b"\x00+", used))
+    free_run = next(free_runs, None)
+    block_clusters = max(1, block_size // cluster_size)
+
+    for first in range(0, clusters, block_clusters):
+        last = min(first + block_clusters, clusters)
+
+        while free_run is not None and free_run[0] < last:
+            yield FATFreeRun(free_run[0] + 2, free_run[1])
+            free_run = next(free_runs, None)
+
+        block = volume.reader.read((last - first) * cluster_size, first * cluster_size, data_offset)
+        yield from _deleted_entries(volume, block, data_offset + first * cluster_size, clusters, used)
@@ -101,3 +101,17 @@ FAT32_LFN = FAT12_LFN
 FAT32_ENTRY = FAT12_ENTRY
 FAT32_ENTRY_SIZE = FAT12_ENTRY_SIZE
 FAT32_ENTRY_PERMS = FAT12_ENTRY_PERMS
+
+# BIOS parameter block fields shared by all variants, used to tell them apart
+FAT_BPB = (
+    (0x0B, 2, 'BytesPerSector', '<H'),
+    (0x0D, 1, 'SectorsPerCluster', 'B'),
+    (0x0E, 2, 'SectorsCount', '<H'),
+    (0x10, 1, 'FATCopies', 'B'),
+    (0x11, 2, 'MaxRootEntries', '<H'),
+    (0x13, 2, 'TotalSectors', '<H'),
+    (0x16, 2, 'SectorsPerFAT', '<H'),  # zero on FAT32
+    (0x20, 4, 'TotalLogicalSectors', '<I'),
+    (0x24, 4, 'SectorsPerFAT32', '<I'),
+    (0x1FE, 2, 'BootSignature', '<H')  # 55 AA
+)
@@ -0,0 +1,41 @@
+from codec import Codec
+
+from .fat import FATBootSector, FATException
+from .fat12 import FAT12Reader
+from .fat16 import FAT16Reader
+from .fat32 import FAT32Reader
+from .signatures import FAT_BPB
+
+FAT_BPB_CODEC = Codec("FATBPB", FAT_BPB)
+
+FAT12_MAX_CLUSTERS = 4085
+FAT16_MAX_CLUSTERS = 65525
+FAT_BOOT_SIGNATURE = 0xAA55
+
+
+def fat_type(data):
+    # The variant is defined by the count of data clusters only, not by the FSType label
+    bpb = FAT_BPB_CODEC.unpack(data)
+
+    if (
+            bpb.BootSignature != FAT_BOOT_SIGNATURE
+            or bpb.BytesPerSector not in (512, 1024, 2048, 4096)
+            or not bpb.SectorsPerCluster or bpb.SectorsPerCluster & (bpb.SectorsPerCluster - 1)
+            or not bpb.FATCopies or not bpb.SectorsCount
+    ):
+        raise FATException("Not a FAT volume")
+
+    root_sectors = (bpb.MaxRootEntries * 32 + bpb.BytesPerSector - 1) // bpb.BytesPerSector
+    fat_sectors = bpb.SectorsPerFAT or bpb.SectorsPerFAT32
+    total_sectors = bpb.TotalSectors or bpb.TotalLogicalSectors
+    clusters = (
+        total_sectors - bpb.SectorsCount - bpb.FATCopies * fat_sectors - root_sectors
+    ) // bpb.SectorsPerCluster
+
+    return 12 if clusters < FAT12_MAX_CLUSTERS else 16 if clusters < FAT16_MAX_CLUSTERS else 32
+
+
+def open_volume(reader, **kwargs):
+    data = reader.read(FATBootSector.SIZE)
+
+    return {12: FAT12Reader, 16: FAT16Reader, 32: FAT32Reader}[fat_type(data)](reader, boot_data=data, **kwargs)
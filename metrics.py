@@ -0,0 +1,94 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+from time import perf_counter
+
+
+class Histogram:
+    # Latencies in seconds, bucket upper bounds double from 1 microsecond to ~17 seconds
+    BOUNDS = tuple(1e-6 * 2 ** i for i in range(25))
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        # Cumulative counts per upper bound, the last one ("+Inf") equals `count`
+        cumulative, total = {}, 0
+
+        for bound, count in zip(self.bounds + (float("inf"),), self.buckets):
+            total += count
+            cumulative[bound] = total
+
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class Metrics:
+    # Counters and latency histograms shared by the instrumented readers and FAT structures, safe to update from
+    # several threads
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        self.lock = Lock()
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        with self.lock:
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in self.histograms.items()}
+            }
+
+    def prometheus(self, prefix="pydisk"):
+        # Prometheus text exposition format, counters get a `_total` suffix and histograms are in seconds
+        snapshot, lines = self.snapshot(), []
+
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append("# TYPE {}_{}_total counter".format(prefix, name))
+            lines.append("{}_{}_total {}".format(prefix, name, value))
+
+        for name, h in sorted(snapshot["histograms"].items()):
+            metric = "{}_{}_seconds".format(prefix, name)
+            lines.append("# TYPE {} histogram".format(metric))
+            lines.extend(
+                '{}_bucket{{le="{}"}} {}'.format(metric, "+Inf" if bound == float("inf") else repr(bound), count)
+                for bound, count in h["buckets"].items()
+            )
+            lines.append("{}_sum {}".format(metric, repr(h["sum"])))
+            lines.append("{}_count {}".format(metric, h["count"]))
+
+        return "\n".join(lines) + "\n"
+
+
+def timer(metrics, name):
+    # `metrics.timer(name)`, or a no-op context when no `Metrics` is attached (None)
+    return nullcontext() if metrics is None else metrics.timer(name)
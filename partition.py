@@ -0,0 +1,205 @@
+from uuid import UUID
+
+from codec import Codec
+from fat import open_volume
+from fat.fat import FATException
+from reader import ReaderWrapper
+
+MBR_ENTRY = (
+    # ( offset, size, name, unpack string)
+    (0x00, 1, 'Status', 'B'),  # 0x80 bootable, 0x00 inactive
+    (0x01, 3, 'CHSFirst', '3s'),
+    (0x04, 1, 'Type', 'B'),
+    (0x05, 3, 'CHSLast', '3s'),
+    (0x08, 4, 'LBAFirst', '<I'),  # relative to the table sector for logical partitions
+    (0x0C, 4, 'Sectors', '<I')
+)
+
+MBR_ENTRIES_OFFSET = 0x1BE
+MBR_ENTRY_SIZE = 16
+MBR_ENTRIES_COUNT = 4
+MBR_SIGNATURE_OFFSET = 0x1FE
+MBR_SIGNATURE = b"\x55\xAA"
+
+MBR_TYPES_EXTENDED = (0x05, 0x0F, 0x85)
+MBR_TYPE_GPT = 0xEE
+
+GPT_HEADER = (
+    (0x00, 8, 'Signature', '8s'),  # EFI PART
+    (0x08, 4, 'Revision', '<I'),
+    (0x0C, 4, 'HeaderSize', '<I'),
+    (0x10, 4, 'HeaderCRC', '<I'),
+    (0x18, 8, 'CurrentLBA', '<Q'),
+    (0x20, 8, 'BackupLBA', '<Q'),
+    (0x28, 8, 'FirstUsableLBA', '<Q'),
+    (0x30, 8, 'LastUsableLBA', '<Q'),
+    (0x38, 16, 'DiskGUID', '16s'),
+    (0x48, 8, 'EntriesLBA', '<Q'),
+    (0x50, 4, 'EntriesCount', '<I'),
+    (0x54, 4, 'EntrySize', '<I'),
+    (0x58, 4, 'EntriesCRC', '<I')
+)
+
+GPT_ENTRY = (
+    (0x00, 16, 'TypeGUID', '16s'),  # all zero for unused entries
+    (0x10, 16, 'GUID', '16s'),
+    (0x20, 8, 'FirstLBA', '<Q'),
+    (0x28, 8, 'LastLBA', '<Q'),  # inclusive
+    (0x30, 8, 'Attributes', '<Q'),
+    (0x38, 72, 'Name', '72s')  # UTF-16LE
+)
+
+GPT_SIGNATURE = b"EFI PART"
+
+MBR_ENTRY_CODEC = Codec("MBREntry", MBR_ENTRY)
+GPT_HEADER_CODEC = Codec("GPTHeader", GPT_HEADER)
+GPT_ENTRY_CODEC = Codec("GPTEntry", GPT_ENTRY)
+
+
+class PartitionException(Exception):
+    pass
+
+
+class PartitionReader(ReaderWrapper):
+    # Bounded view of a partition, addresses are relative to the partition start. Nothing is copied.
+    def __init__(self, reader, offset, size, index=None, scheme=None, type=None, name=None):
+        super().__init__(reader)
+
+        self.offset = offset
+        self.size = size
+        self.index = index
+        self.scheme = scheme
+        self.type = type
+        self.name = name
+
+    def _bounds(self, size, rel_ptr, base_ptr):
+        ptr = (base_ptr or 0) + rel_ptr
+        return self.offset + ptr, max(min(size, self.size - ptr), 0)
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        ptr, size = self._bounds(size, rel_ptr, base_ptr)
+        return self.reader.read(size, ptr)
+
+    def readinto(self, buffer, rel_ptr=0, base_ptr=None):
+        view = memoryview(buffer).cast("B")
+        ptr, size = self._bounds(len(view), rel_ptr, base_ptr)
+        return self.reader.readinto(view[:size], ptr)
+
+    def __repr__(self):
+        return "PartitionReader(index={}, scheme={}, type={}, offset={}, size={}, name={!r})".format(
+            self.index, self.scheme, self.type, self.offset, self.size, self.name
+        )
+
+
+def _mbr_entries(reader, ptr):
+    data = reader.read(MBR_SIGNATURE_OFFSET + len(MBR_SIGNATURE), ptr)
+
+    if data[MBR_SIGNATURE_OFFSET:] != MBR_SIGNATURE:
+        raise PartitionException("Missing MBR signature")
+
+    entries = [
+        MBR_ENTRY_CODEC.unpack(data, MBR_ENTRIES_OFFSET + i * MBR_ENTRY_SIZE) for i in range(MBR_ENTRIES_COUNT)
+    ]
+
+    if any(e.Status not in (0x00, 0x80) for e in entries):
+        raise PartitionException("Invalid MBR partition status")
+
+    return entries
+
+
+def _read_logical(reader, ext_lba, sector_size, first_index):
+    # Extended partitions hold a chain of EBRs: entry 0 is a logical partition relative to its own EBR,
+    # entry 1 links the next EBR relative to the start of the extended partition
+    partitions, ebr_lba, visited = [], ext_lba, set()
+
+    while ebr_lba not in visited:
+        visited.add(ebr_lba)
+        logical, link = _mbr_entries(reader, ebr_lba * sector_size)[:2]
+
+        if logical.Type and logical.Sectors:
+            partitions.append(PartitionReader(
+                reader,
+                (ebr_lba + logical.LBAFirst) * sector_size,
+                logical.Sectors * sector_size,
+                first_index + len(partitions),
+                "mbr",
+                logical.Type
+            ))
+
+        if link.Type not in MBR_TYPES_EXTENDED or not link.Sectors:
+            break
+
+        ebr_lba = ext_lba + link.LBAFirst
+
+    return partitions
+
+
+def read_mbr(reader, sector_size=512):
+    partitions = []
+
+    for i, entry in enumerate(_mbr_entries(reader, 0)):
+        if not entry.Type or not entry.Sectors:
+            continue
+
+        if entry.Type in MBR_TYPES_EXTENDED:
+            partitions.extend(_read_logical(reader, entry.LBAFirst, sector_size, MBR_ENTRIES_COUNT))
+            continue
+
+        partitions.append(PartitionReader(
+            reader, entry.LBAFirst * sector_size, entry.Sectors * sector_size, i, "mbr", entry.Type
+        ))
+
+    return partitions
+
+
+def read_gpt(reader, sector_size=512):
+    header = GPT_HEADER_CODEC.unpack(reader.read(sector_size, sector_size))
+
+    if header.Signature != GPT_SIGNATURE:
+        raise PartitionException("Missing GPT signature")
+
+    data = reader.read(header.EntriesCount * header.EntrySize, header.EntriesLBA * sector_size)
+
+    return [
+        PartitionReader(
+            reader,
+            entry.FirstLBA * sector_size,
+            (entry.LastLBA - entry.FirstLBA + 1) * sector_size,
+            i,
+            "gpt",
+            str(UUID(bytes_le=entry.TypeGUID)),
+            entry.Name.decode("utf-16-le", errors="replace").rstrip("\x00")
+        )
+        for i, entry in (
+            (i, GPT_ENTRY_CODEC.unpack(data, i * header.EntrySize))
+            for i in range(min(header.EntriesCount, len(data) // header.EntrySize))
+        )
+        if any(entry.TypeGUID)
+    ]
+
+
+def read_partitions(reader, sector_size=512):
+    entries = _mbr_entries(reader, 0)
+
+    if any(e.Type == MBR_TYPE_GPT for e in entries):
+        return read_gpt(reader, sector_size)
+
+    return read_mbr(reader, sector_size)
+
+
+def open_volumes(reader, sector_size=512, **kwargs):
+    # FAT volumes of a whole disk, or of an unpartitioned image holding a single volume
+    try:
+        return [open_volume(reader, **kwargs)]
+    except FATException:
+        pass
+
+    volumes = []
+
+    for partition in read_partitions(reader, sector_size):
+        try:
+            volumes.append(open_volume(partition, **kwargs))
+        except FATException:
+            continue
+
+    return volumes
@@ -1,13 +1,27 @@
-from struct import unpack
+import os
+from mmap import mmap, ACCESS_READ
+from struct import unpack, unpack_from
+from time import perf_counter
+
+from metrics import Metrics
+from utils import LRUCache
 
 
 class Reader:
+    thread_safe = False
+
     def read(self, size, rel_ptr=0, base_ptr=None):
         raise NotImplementedError("Not implemented")
 
     def unpack(self, unpack_str, size, rel_ptr=0, base_ptr=None):
         return unpack(unpack_str, self.read(size, rel_ptr, base_ptr))
 
+    def readinto(self, buffer, rel_ptr=0, base_ptr=None):
+        view = memoryview(buffer).cast("B")
+        data = self.read(len(view), rel_ptr, base_ptr)
+        view[:len(data)] = data
+        return len(data)
+
 
 class FileReader(Reader):
     def __init__(self, fs, base_ptr=None):
@@ -23,3 +37,168 @@ class FileReader(Reader):
             return self.fs.read(size)
         finally:
             self.fs.seek(ptr)
+
+
+class PReadReader(Reader):
+    # Positional reads without a shared file cursor, safe to share between threads. Needs `os.pread` (Unix);
+    # `readinto` reads in place with `os.preadv` where the platform has it and copies otherwise
+    thread_safe = True
+
+    def __init__(self, fs, base_ptr=None):
+        super().__init__()
+
+        if not hasattr(os, "pread"):
+            raise NotImplementedError("os.pread is not available on this platform")
+
+        self.fs = fs
+        self.fd = self.fs.fileno()
+        self.base_ptr = base_ptr or self.fs.tell()
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        return os.pread(self.fd, size, (base_ptr or self.base_ptr) + rel_ptr)
+
+    def readinto(self, buffer, rel_ptr=0, base_ptr=None):
+        if not hasattr(os, "preadv"):
+            return super().readinto(buffer, rel_ptr, base_ptr)
+
+        return os.preadv(self.fd, [buffer], (base_ptr or self.base_ptr) + rel_ptr)
+
+
+class MmapReader(Reader):
+    # Maps the whole image once; `read` returns zero-copy memoryview slices of the mapping.
+    # Slices keep the mapping alive, release them before `close`.
+    thread_safe = True
+
+    def __init__(self, fs, base_ptr=None):
+        super().__init__()
+
+        self.fs = fs
+        self.base_ptr = base_ptr or self.fs.tell()
+        self.mm = mmap(self.fs.fileno(), 0, access=ACCESS_READ)
+        self.view = memoryview(self.mm)
+
+    def _ptr(self, rel_ptr, base_ptr):
+        return (base_ptr or self.base_ptr) + rel_ptr
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        ptr = self._ptr(rel_ptr, base_ptr)
+        return self.view[ptr: ptr + size]
+
+    def unpack(self, unpack_str, size, rel_ptr=0, base_ptr=None):
+        return unpack_from(unpack_str, self.view, self._ptr(rel_ptr, base_ptr))
+
+    def close(self):
+        self.view.release()
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class ReaderWrapper(Reader):
+    # Base of readers layered over another one, thread safety and the backing file are those of the wrapped reader
+    def __init__(self, reader):
+        super().__init__()
+
+        self.reader = reader
+
+    @property
+    def thread_safe(self):
+        return self.reader.thread_safe
+
+    @property
+    def fs(self):
+        # Backing file of the wrapped reader, if any
+        return getattr(self.reader, "fs", None)
+
+
+class CachingReader(ReaderWrapper):
+    # Block-aligned LRU cache over any reader, addresses are relative to the wrapped reader's own base.
+    # Consecutive missing blocks are fetched with a single read.
+    BLOCK_SIZE = 512
+    BUDGET = 64 * 1024 * 1024
+    # The block cache is not safe for concurrent use
+    thread_safe = False
+
+    def __init__(self, reader, block_size=BLOCK_SIZE, budget=BUDGET):
+        super().__init__(reader)
+
+        self.block_size = block_size
+        self.cache = LRUCache(budget, len)
+
+    def _fetch(self, first, count):
+        data = self.reader.read(count * self.block_size, first * self.block_size)
+
+        return [
+            self.cache.put(first + i, bytes(data[i * self.block_size: (i + 1) * self.block_size]))
+            for i in range(count)
+        ]
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        ptr = (base_ptr or 0) + rel_ptr
+
+        if size <= 0:
+            return b""
+
+        first, last = ptr // self.block_size, (ptr + size - 1) // self.block_size
+        blocks = [self.cache.get(i) for i in range(first, last + 1)]
+
+        i = 0
+        while i < len(blocks):
+            if blocks[i] is not None:
+                i += 1
+                continue
+
+            j = next((k for k in range(i, len(blocks)) if blocks[k] is not None), len(blocks))
+            blocks[i: j] = self._fetch(first + i, j - i)
+            i = j
+
+        offset = ptr - first * self.block_size
+        return b"".join(blocks)[offset: offset + size]
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "evictions": self.cache.evictions,
+            "used": self.cache.used,
+            "budget": self.cache.budget
+        }
+
+
+class InstrumentedReader(ReaderWrapper):
+    # Counts reads, bytes and seek distance of the wrapped reader and records their latency into `metrics`.
+    # Seek distance is measured between the end of a read and the start of the next one.
+    def __init__(self, reader, metrics=None):
+        super().__init__(reader)
+
+        self.metrics = Metrics() if metrics is None else metrics
+        self._next = None
+
+    def _account(self, ptr, size, start):
+        metrics = self.metrics
+        metrics.observe("read", perf_counter() - start)
+        metrics.count("reads")
+        metrics.count("read_bytes", size)
+
+        if self._next is not None and ptr != self._next:
+            metrics.count("seeks")
+            metrics.count("seek_distance", abs(ptr - self._next))
+
+        self._next = ptr + size
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        start = perf_counter()
+        data = self.reader.read(size, rel_ptr, base_ptr)
+        self._account((base_ptr or 0) + rel_ptr, len(data), start)
+        return data
+
+    def readinto(self, buffer, rel_ptr=0, base_ptr=None):
+        start = perf_counter()
+        size = self.reader.readinto(buffer, rel_ptr, base_ptr)
+        self._account((base_ptr or 0) + rel_ptr, size, start)
+        return size
@@ -0,0 +1,111 @@
+from io import BytesIO
+
+import pytest
+
+from fat import open_volume
+from fat.image import FAT_EOC, build_image, random_tree
+from reader import FileReader
+
+# Volume size in 512 byte sectors (and clusters) of each FAT type
+TOTAL_SECTORS = {12: 4000, 16: 20000, 32: 70000}
+FAT_BAD = {12: 0xFF7, 16: 0xFFF7, 32: 0x0FFFFFF7}
+
+
+def flatten(tree, prefix=""):
+    # {path: contents} of every file of a `fat.image` tree
+    files = {}
+
+    for name, node in tree.items():
+        if isinstance(node, dict):
+            files.update(flatten(node, prefix + "/" + name))
+        else:
+            files[prefix + "/" + name] = node
+
+    return files
+
+
+def set_fat(image, fat, boot_sector, cluster, value, copies=None):
+    # Writes `value` for `cluster` into the given FAT copies (all of them by default) of a bytearray image
+    for copy in range(boot_sector.fats_copies) if copies is None else copies:
+        ptr = boot_sector.fats_offset + copy * boot_sector.fat_size
+
+        if fat == 12:
+            ptr += cluster * 3 // 2
+            old = int.from_bytes(image[ptr: ptr + 2], "little")
+            new = old & 0x000F | value << 4 if cluster & 1 else old & 0xF000 | value
+            image[ptr: ptr + 2] = new.to_bytes(2, "little")
+        else:
+            ptr += cluster * fat // 8
+            image[ptr: ptr + fat // 8] = value.to_bytes(fat // 8, "little")
+
+
+def set_entry_cluster(image, entry, cluster):
+    # Rewrites the first cluster of a directory entry in a bytearray image, the record is found by its contents
+    ptr, codec = image.find(entry.record), entry.directory._get_entry_codec()
+    hi, lo = ptr + codec.offset("ClusterHi"), ptr + codec.offset("ClusterLo")
+    image[hi: hi + 2] = (cluster >> 16).to_bytes(2, "little")
+    image[lo: lo + 2] = (cluster & 0xFFFF).to_bytes(2, "little")
+
+
+def last_cluster(extents):
+    start, length = extents[-1]
+    return start + length - 1
+
+
+def adjacent_free(volume):
+    # Path and last cluster of a file whose chain ends right before a free cluster
+    used = volume.primary_fat.runs(volume.boot_sector.clusters).used
+
+    return next(
+        (path.rstrip("/") + "/" + entry.name, last_cluster(entry.extents))
+        for path, _, files in volume.walk() for entry in files
+        if entry.cluster and not used[last_cluster(entry.extents) - 1]
+    )
+
+
+@pytest.fixture(scope="session")
+def tree():
+    tree = random_tree(seed=7, depth=2, fanout=2, files=6, size=lambda r: r.randint(0, 6000))
+    tree.update({
+        "A.TXT": b"root file",
+        "EMPTY.TXT": b"",
+        "B.BIN": bytes(range(256)) * 12,
+        "Long Name With Spaces.dat": bytes(range(255, -1, -1)) * 40
+    })
+    return tree
+
+
+@pytest.fixture(scope="session", params=sorted(TOTAL_SECTORS))
+def image(request, tree):
+    fat = request.param
+    return fat, build_image(fat, tree, TOTAL_SECTORS[fat], fragmentation=0.3, seed=fat)
+
+
+@pytest.fixture
+def volume(image):
+    return open_volume(FileReader(BytesIO(image[1])))
+
+
+@pytest.fixture
+def image_path(image, tmp_path):
+    path = tmp_path / "fat{}.img".format(image[0])
+    path.write_bytes(image[1])
+    return path
+
+
+@pytest.fixture
+def corrupt(image):
+    # Applies `edits(volume)`, a list of (cluster, value), to a copy of the image and opens the result
+    fat, data = image
+
+    def apply(edits, copies=None):
+        volume, corrupted = open_volume(FileReader(BytesIO(data))), bytearray(data)
+
+        for cluster, value in edits(volume):
+            set_fat(corrupted, fat, volume.boot_sector, cluster, value, copies)
+
+        return open_volume(FileReader(BytesIO(bytes(corrupted))))
+
+    apply.eoc = FAT_EOC[fat]
+    apply.bad = FAT_BAD[fat]
+    return apply
@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import SEEK_CUR, SEEK_END
+
+import pytest
+
+from fat import AsyncFATReader, open_volume
+from fat.aio import AsyncReader
+from fat.fat import FATEntryNonFile, FATEntryNotFound
+from reader import PReadReader, Reader
+
+
+class RecordingReader(Reader):
+    # In-memory reader logging the offset of every read, reads at `fail_at` raise
+    thread_safe = True
+
+    def __init__(self, data, fail_at=None):
+        self.data = data
+        self.fail_at = fail_at
+        self.reads = []
+
+    def read(self, size, rel_ptr=0, base_ptr=None):
+        ptr = (base_ptr or 0) + rel_ptr
+
+        if ptr == self.fail_at:
+            raise OSError("bad sector")
+
+        self.reads.append(ptr)
+        return self.data[ptr: ptr + size]
+
+
+def test_reads_are_batched_in_offset_order():
+    reader = RecordingReader(bytes(range(256)))
+    async_reader = AsyncReader(reader)
+    batches = []
+    read_batch = async_reader._read_batch
+    async_reader._read_batch = lambda batch: batches.append(len(batch)) or read_batch(batch)
+
+    async def main():
+        return await asyncio.gather(*(async_reader.read(4, ptr) for ptr in (200, 10, 100, 50)))
+
+    try:
+        assert asyncio.run(main()) == [bytes(range(p, p + 4)) for p in (200, 10, 100, 50)]
+    finally:
+        async_reader.close()
+
+    assert batches == [4]
+    assert reader.reads == [10, 50, 100, 200]
+
+
+def test_read_errors_reach_their_caller():
+    async_reader = AsyncReader(RecordingReader(bytes(256), fail_at=100))
+
+    async def main():
+        return await asyncio.gather(async_reader.read(4, 10), async_reader.read(4, 100), return_exceptions=True)
+
+    try:
+        good, bad = asyncio.run(main())
+    finally:
+        async_reader.close()
+
+    assert good == bytes(4)
+    assert isinstance(bad, OSError)
+
+
+def test_given_executor_is_not_shut_down(image_path):
+    with open(image_path, "rb") as f, ThreadPoolExecutor(2) as executor:
+        async def main():
+            async with AsyncFATReader(open_volume(PReadReader(f)), executor) as volume:
+                await volume.lookup("/A.TXT")
+
+        asyncio.run(main())
+        assert executor.submit(lambda: 1).result() == 1
+
+        own = AsyncFATReader(open_volume(PReadReader(f)))
+        own.close()
+
+        with pytest.raises(RuntimeError):
+            own.reader.executor.submit(lambda: 1)
+
+
+def test_scandir_and_lookup(image_path, tree):
+    with open(image_path, "rb") as f:
+        volume = open_volume(PReadReader(f))
+
+        async def main():
+            async with AsyncFATReader(volume) as async_volume:
+                names = [entry.name async for entry in async_volume.scandir("/")]
+                directory = next(e for e in volume.scandir("/") if e.is_directory)
+                sub_names = [entry.name async for entry in await async_volume.lookup("/" + directory.name)]
+                data = await (await async_volume.lookup("/B.BIN")).read(100, 50)
+
+                with pytest.raises(FATEntryNotFound):
+                    await async_volume.lookup("/missing")
+
+                with pytest.raises(FATEntryNonFile):
+                    await (await async_volume.lookup("/" + directory.name)).read()
+
+                return names, directory, sub_names, data
+
+        names, directory, sub_names, data = asyncio.run(main())
+
+        assert names == [e.name for e in volume.scandir("/")]
+        assert sub_names == [e.name for e in directory.scandir()]
+        assert data == tree["B.BIN"][50: 150]
+
+
+def test_stream(image_path, tree):
+    expected = tree["Long Name With Spaces.dat"]
+
+    with open(image_path, "rb") as f:
+        async def main():
+            async with AsyncFATReader(open_volume(PReadReader(f))) as volume:
+                async with await volume.open("/Long Name With Spaces.dat") as src:
+                    head = await src.read(1000)
+                    src.seek(500, SEEK_CUR)
+                    middle = await src.read(10)
+                    tell = src.tell()
+                    src.seek(-20, SEEK_END)
+                    tail = await src.read()
+                    return head, middle, tell, tail, await src.read()
+
+        head, middle, tell, tail, end = asyncio.run(main())
+
+    assert head == expected[:1000]
+    assert middle == expected[1500: 1510] and tell == 1510
+    assert tail == expected[-20:]
+    assert end == b""
@@ -0,0 +1,57 @@
+from io import BytesIO
+
+from conftest import flatten, set_entry_cluster
+from fat import FATCatalog, open_volume
+from fat.image import build_image
+from metrics import Metrics
+from reader import FileReader, PReadReader
+
+
+def walked(volume):
+    return {
+        path.rstrip("/") + "/" + entry.name: entry.read() for path, _, entries in volume.walk() for entry in entries
+    }
+
+
+def test_catalog_listing(image_path, tree, tmp_path):
+    with open(image_path, "rb") as f, FATCatalog(str(tmp_path / "volume.catalog")) as catalog:
+        assert walked(open_volume(PReadReader(f), catalog=catalog)) == flatten(tree)
+
+        # A second volume over the unchanged image is answered from the catalog alone
+        metrics = Metrics()
+        volume = open_volume(PReadReader(f), catalog=catalog, metrics=metrics)
+
+        assert catalog.is_current(catalog.volume_key(volume))
+        assert walked(volume) == flatten(tree)
+        assert "dir_slots" not in metrics.snapshot()["counters"]
+
+
+def test_catalog_in_memory_image(image, tree, tmp_path):
+    # Readers without a file descriptor are keyed by the FAT and root directory checksums only
+    _, data = image
+
+    with FATCatalog(str(tmp_path / "volume.catalog")) as catalog:
+        volume = open_volume(FileReader(BytesIO(data)), catalog=catalog)
+        assert walked(volume) == flatten(tree)
+
+        # Same FAT, a root entry moved to an empty file's cluster
+        entry = volume.lookup("/A.TXT")
+        changed = bytearray(data)
+        set_entry_cluster(changed, entry, 0)
+
+        assert open_volume(FileReader(BytesIO(bytes(changed))), catalog=catalog).lookup("/A.TXT").cluster == 0
+
+
+def test_catalog_rebuilt_after_rewrite(image, tree, image_path, tmp_path):
+    fat, _ = image
+    changed = dict(tree, **{"NEW.TXT": b"new file"})
+    del changed["A.TXT"]
+
+    with FATCatalog(str(tmp_path / "volume.catalog")) as catalog:
+        with open(image_path, "rb") as f:
+            assert walked(open_volume(PReadReader(f), catalog=catalog)) == flatten(tree)
+
+        image_path.write_bytes(build_image(fat, changed, len(image[1]) // 512, fragmentation=0.3, seed=fat))
+
+        with open(image_path, "rb") as f:
+            assert walked(open_volume(PReadReader(f), catalog=catalog)) == flatten(changed)
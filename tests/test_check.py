@@ -0,0 +1,93 @@
+import pytest
+
+from conftest import adjacent_free, last_cluster
+from fat import check_volume
+
+
+def free_cluster(volume):
+    return volume.primary_fat.runs(volume.boot_sector.clusters).used.find(b"\x00") + 2
+
+
+@pytest.fixture
+def chains(volume):
+    # Extents of a long file and of a second file of at least two clusters
+    return volume.lookup("/Long Name With Spaces.dat").extents, volume.lookup("/B.BIN").extents
+
+
+def test_clean_volume(volume):
+    report = check_volume(volume)
+
+    assert report.ok, report
+
+
+def test_cycle(corrupt, chains):
+    a, _ = chains
+    report = check_volume(corrupt(lambda v: [(last_cluster(a), a[0][0])]))
+
+    assert report.cycles
+    assert ("/Long Name With Spaces.dat", a[0][0]) not in report.bad_entries
+
+
+def test_cross_link(corrupt, chains):
+    a, b = chains
+    second = [cluster for start, length in b for cluster in range(start, start + length)][1]
+    report = check_volume(corrupt(lambda v: [(last_cluster(a), second)]))
+
+    assert second in report.cross_links
+    assert not report.cycles
+
+
+def test_out_of_range(corrupt, volume, chains):
+    a, _ = chains
+    edit = (last_cluster(a), volume.boot_sector.clusters + 10)
+
+    assert check_volume(corrupt(lambda v: [edit])).out_of_range == [edit]
+
+
+def test_out_of_range_at_data_end(corrupt, volume):
+    # A chain running into the end of the data area ends there
+    last = volume.boot_sector.clusters + 1
+    report = check_volume(corrupt(lambda v: [(last - 1, last), (last, last + 1)]))
+
+    assert report.out_of_range == [(last, last + 1)]
+    assert report.lost_chains == [last - 1]
+
+
+def test_free_link(corrupt, volume, chains):
+    a, _ = chains
+    edit = (last_cluster(a), free_cluster(volume))
+
+    assert check_volume(corrupt(lambda v: [edit])).free_links == [edit]
+
+
+def test_free_link_to_next_cluster(corrupt, volume):
+    # The linked cluster directly follows the chain, the run must still end before it
+    path, last = adjacent_free(volume)
+    report = check_volume(corrupt(lambda v: [(last, last + 1)]))
+
+    assert report.free_links == [(last, last + 1)]
+    assert not report.out_of_range and not report.bad_entries and not report.size_mismatches
+
+
+def test_lost_chain(corrupt, volume):
+    cluster = free_cluster(volume)
+
+    assert check_volume(corrupt(lambda v: [(cluster, corrupt.eoc)])).lost_chains == [cluster]
+
+
+def test_short_chain(corrupt, chains):
+    a, _ = chains
+    report = check_volume(corrupt(lambda v: [(a[0][0], corrupt.eoc)]))
+
+    assert [path for path, _, _ in report.size_mismatches] == ["/Long Name With Spaces.dat"]
+    assert report.lost_chains
+
+
+def test_fat_copy_mismatch(corrupt, volume, chains):
+    a, _ = chains
+    edits = [(last_cluster(a), a[0][0]), (free_cluster(volume), corrupt.eoc)]
+    report = check_volume(corrupt(lambda v: edits, copies=[1]))
+
+    # Only the primary FAT is followed, the copy is just compared with it
+    assert report.fat_mismatches == {1: sorted(cluster for cluster, _ in edits)}
+    assert not report.cycles and not report.lost_chains
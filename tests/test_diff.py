@@ -0,0 +1,72 @@
+from io import BytesIO
+from random import Random
+
+from conftest import TOTAL_SECTORS
+from fat import diff_volumes, open_volume
+from fat.image import build_image
+from reader import FileReader
+
+
+def volume_of(data):
+    return open_volume(FileReader(BytesIO(data)))
+
+
+def test_identical_volumes(image):
+    _, data = image
+
+    assert diff_volumes(volume_of(data), volume_of(data)) == ([], [], [], [])
+
+
+def test_rebuilt_tree(image):
+    fat, _ = image
+    rnd = Random(fat)
+    keep, gone, edit, move, same, new, child = (rnd.randbytes(rnd.randint(1, 3000)) for _ in range(7))
+    a = {
+        "KEEP.TXT": keep, "GONE.TXT": gone, "EDIT.TXT": edit,
+        "SUB": {"Moved away.txt": move, "X": b"file"},
+        "DIR": {"SAME.TXT": same}
+    }
+    b = {
+        "KEEP.TXT": keep, "EDIT.TXT": edit + b"changed", "NEW.TXT": new,
+        "SUB": {"X": {"CHILD.TXT": child}},
+        "DIR": {"SAME.TXT": same, "Moved here.txt": move}
+    }
+    diff = diff_volumes(
+        volume_of(build_image(fat, a, TOTAL_SECTORS[fat])), volume_of(build_image(fat, b, TOTAL_SECTORS[fat]))
+    )
+
+    assert diff.added == ["/NEW.TXT", "/SUB/X/CHILD.TXT"]
+    # A file replaced by a directory of the same name is removed and the directory's files are added
+    assert diff.removed == ["/GONE.TXT", "/SUB/X"]
+    assert diff.modified == ["/EDIT.TXT"]
+    assert diff.moved == [("/SUB/Moved away.txt", "/DIR/Moved here.txt")]
+
+
+def test_edited_in_place(image):
+    # Same layout on both sides: contents rewritten with a new MDate, and a rename keeping the clusters
+    _, data = image
+    a = volume_of(data)
+    edited, renamed = a.lookup("/B.BIN"), a.lookup("/A.TXT")
+    codec, changed = edited.directory._get_entry_codec(), bytearray(data)
+
+    ptr = a.boot_sector.data_offset + (edited.cluster - 2) * a.boot_sector.cluster_size
+    changed[ptr: ptr + 4] = b"EDIT"
+    ptr = changed.find(edited.record) + codec.offset("MDate")
+    changed[ptr: ptr + 2] = (edited.params.MDate + 1).to_bytes(2, "little")
+    ptr = changed.find(renamed.record) + codec.offset("Name")
+    changed[ptr: ptr + 8] = b"Z       "
+
+    diff = diff_volumes(a, volume_of(bytes(changed)))
+
+    assert diff == ([], [], ["/B.BIN"], [("/A.TXT", "/Z.TXT")])
+
+
+def test_same_size_same_date_is_not_read(image):
+    # Files whose layout, size and MDate are unchanged are not hashed, as documented
+    _, data = image
+    a = volume_of(data)
+    entry, changed = a.lookup("/B.BIN"), bytearray(data)
+    ptr = a.boot_sector.data_offset + (entry.cluster - 2) * a.boot_sector.cluster_size
+    changed[ptr: ptr + 4] = b"EDIT"
+
+    assert diff_volumes(a, volume_of(bytes(changed))).modified == []
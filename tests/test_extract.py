@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from conftest import flatten
+from fat import open_volume
+from reader import FileReader, PReadReader
+
+
+@pytest.mark.parametrize("reader_cls", (FileReader, PReadReader))
+def test_extract(image_path, tree, tmp_path, reader_cls):
+    out = tmp_path / "out"
+
+    with open(image_path, "rb") as f:
+        volume = open_volume(reader_cls(f))
+        written = volume.extract(str(out), workers=4)
+        files = flatten(tree)
+
+        assert sorted(written) == sorted(str(out) + path for path in files)
+        assert {path: (out / path[1:]).read_bytes() for path in files} == files
+
+        for path, dirs, entries in volume.walk():
+            for entry in dirs + entries:
+                host_path = out / (path.rstrip("/") + "/" + entry.name)[1:]
+                assert os.stat(host_path).st_mtime == entry.modified.timestamp()
+
+
+def test_extract_paths(image_path, tree, tmp_path):
+    out = tmp_path / "out"
+
+    with open(image_path, "rb") as f:
+        volume = open_volume(PReadReader(f))
+        directory = next(e for e in volume.scandir("/") if e.is_directory)
+        volume.extract(str(out), paths=["/A.TXT", "/" + directory.name])
+
+    assert sorted(p.name for p in out.iterdir()) == sorted(["A.TXT", directory.name])
+    assert {"/" + p.relative_to(out).as_posix(): p.read_bytes() for p in out.rglob("*") if p.is_file()} == {
+        path: data for path, data in flatten(tree).items() if path == "/A.TXT" or path.startswith(
+            "/" + directory.name + "/"
+        )
+    }
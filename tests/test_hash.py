@@ -0,0 +1,35 @@
+import hashlib
+
+import pytest
+
+from conftest import flatten
+from fat import open_volume
+from reader import FileReader, PReadReader
+
+
+@pytest.mark.parametrize("reader_cls", (FileReader, PReadReader))
+@pytest.mark.parametrize("algorithm", ("sha256", "md5"))
+def test_hash_tree(image_path, tree, reader_cls, algorithm):
+    expected = {path: hashlib.new(algorithm, data).hexdigest() for path, data in flatten(tree).items()}
+
+    with open(image_path, "rb") as f:
+        assert open_volume(reader_cls(f)).hash_tree(algorithm, workers=4) == expected
+
+
+def test_hash_tree_cache(image_path, tree):
+    expected = {path: hashlib.sha256(data).hexdigest() for path, data in flatten(tree).items()}
+    cache = {}
+
+    with open(image_path, "rb") as f:
+        volume = open_volume(PReadReader(f))
+
+        assert volume.hash_tree(cache=cache) == expected
+        assert set(cache.values()) == set(expected.values())
+
+        # Digests found in the cache are returned as they are, without reading the files
+        cache = {key: "cached " + value for key, value in cache.items()}
+        assert volume.hash_tree(cache=cache) == {path: "cached " + value for path, value in expected.items()}
+
+        entry = volume.lookup("/B.BIN")
+        assert cache[volume.hash_key(entry)] == "cached " + expected["/B.BIN"]
+        assert volume.hash_files([("/B.BIN", entry)]) == {"/B.BIN": expected["/B.BIN"]}
@@ -0,0 +1,167 @@
+from io import BytesIO
+from uuid import UUID, uuid4
+
+import pytest
+
+from conftest import TOTAL_SECTORS
+from fat import open_volume
+from fat.fat import FATException
+from fat.fat12 import FAT12Reader
+from fat.fat16 import FAT16Reader
+from fat.fat32 import FAT32Reader
+from fat.image import build_image
+from fat.volume import fat_type
+from partition import (
+    GPT_ENTRY_CODEC, GPT_HEADER_CODEC, GPT_SIGNATURE, MBR_ENTRIES_OFFSET, MBR_ENTRY_CODEC, MBR_ENTRY_SIZE,
+    MBR_SIGNATURE, MBR_SIGNATURE_OFFSET, PartitionException, open_volumes, read_partitions
+)
+from reader import FileReader
+
+SECTOR = 512
+BASIC_DATA = UUID("EBD0A0A2-B9E5-4433-87C0-68B6B72699C7")
+
+
+def volume(fat, label):
+    return build_image(fat, {label + ".TXT": label.encode()}, TOTAL_SECTORS[fat], label=label)
+
+
+def mbr(*entries):
+    # Table sector with (type, first LBA, sectors) entries
+    data = bytearray(SECTOR)
+
+    for i, (type, lba, sectors) in enumerate(entries):
+        ptr = MBR_ENTRIES_OFFSET + i * MBR_ENTRY_SIZE
+        data[ptr: ptr + MBR_ENTRY_SIZE] = MBR_ENTRY_CODEC.pack((0, bytes(3), type, bytes(3), lba, sectors))
+
+    data[MBR_SIGNATURE_OFFSET:] = MBR_SIGNATURE
+    return data
+
+
+def gpt_entry(lba, data, name):
+    return GPT_ENTRY_CODEC.pack((
+        BASIC_DATA.bytes_le, uuid4().bytes_le, lba, lba + len(data) // SECTOR - 1, 0, name.encode("utf-16-le")
+    ))
+
+
+def put(disk, lba, data):
+    disk[lba * SECTOR: lba * SECTOR + len(data)] = data
+
+
+@pytest.fixture(scope="module")
+def mbr_disk():
+    # Primary FAT12, a non-FAT primary, and an extended partition with a chain of two EBRs holding FAT16 and FAT12
+    fat12, fat16, other = volume(12, "PRIMARY"), volume(16, "LOGICAL1"), bytes(64 * SECTOR)
+    logical2 = volume(12, "LOGICAL2")
+    size12, size16 = len(fat12) // SECTOR, len(fat16) // SECTOR
+
+    primary, extended = 2048, 2048 + size12 + 64
+    ebr2 = 63 + size16 + 1
+    total = extended + ebr2 + 63 + size12
+
+    disk = bytearray(total * SECTOR)
+    put(disk, 0, mbr(
+        (0x01, primary, size12), (0x00, 0, 0), (0x07, primary + size12, 64), (0x0F, extended, total - extended)
+    ))
+    put(disk, primary, fat12)
+    put(disk, primary + size12, other)
+    put(disk, extended, mbr((0x06, 63, size16), (0x05, ebr2, 63 + size12)))
+    put(disk, extended + 63, fat16)
+    put(disk, extended + ebr2, mbr((0x01, 63, size12)))
+    put(disk, extended + ebr2 + 63, logical2)
+
+    return bytes(disk), [(0, primary, fat12), (2, primary + size12, other), (4, extended + 63, fat16),
+                         (5, extended + ebr2 + 63, logical2)]
+
+
+@pytest.fixture(scope="module")
+def gpt_disk():
+    fat16, fat32 = volume(16, "GPT16"), volume(32, "GPT32")
+    first, second = 2048, 2048 + len(fat16) // SECTOR
+    total = second + len(fat32) // SECTOR + 34
+
+    disk = bytearray(total * SECTOR)
+    put(disk, 0, mbr((0xEE, 1, total - 1)))
+    put(disk, 1, GPT_HEADER_CODEC.pack((
+        GPT_SIGNATURE, 0x10000, GPT_HEADER_CODEC.size, 0, 1, total - 1, 34, total - 34, uuid4().bytes_le, 2, 128,
+        GPT_ENTRY_CODEC.size, 0
+    )))
+    # An unused slot between the two partitions is skipped
+    put(disk, 2, b"".join((
+        gpt_entry(first, fat16, "first"), bytes(GPT_ENTRY_CODEC.size), gpt_entry(second, fat32, "second")
+    )))
+    put(disk, first, fat16)
+    put(disk, second, fat32)
+
+    return bytes(disk), [(0, first, fat16, "first"), (2, second, fat32, "second")]
+
+
+def test_mbr_partitions(mbr_disk):
+    disk, layout = mbr_disk
+    partitions = read_partitions(FileReader(BytesIO(disk)))
+
+    assert [(p.index, p.scheme, p.offset, p.size) for p in partitions] == [
+        (index, "mbr", lba * SECTOR, len(data)) for index, lba, data in layout
+    ]
+    assert [p.type for p in partitions] == [0x01, 0x07, 0x06, 0x01]
+
+    for partition, (_, _, data) in zip(partitions, layout):
+        assert partition.read(len(data) + SECTOR) == data
+        assert partition.read(SECTOR, len(data) - 10) == data[-10:]
+
+
+def test_gpt_partitions(gpt_disk):
+    disk, layout = gpt_disk
+    partitions = read_partitions(FileReader(BytesIO(disk)))
+
+    assert [(p.index, p.scheme, p.type, p.name, p.offset, p.size) for p in partitions] == [
+        (index, "gpt", str(BASIC_DATA), name, lba * SECTOR, len(data)) for index, lba, data, name in layout
+    ]
+
+
+def test_open_volumes(mbr_disk, gpt_disk):
+    mbr_volumes = open_volumes(FileReader(BytesIO(mbr_disk[0])))
+    gpt_volumes = open_volumes(FileReader(BytesIO(gpt_disk[0])))
+
+    assert [(type(v), v.volume_label) for v in mbr_volumes] == [
+        (FAT12Reader, "PRIMARY"), (FAT16Reader, "LOGICAL1"), (FAT12Reader, "LOGICAL2")
+    ]
+    assert [(type(v), v.volume_label) for v in gpt_volumes] == [(FAT16Reader, "GPT16"), (FAT32Reader, "GPT32")]
+
+    for v in mbr_volumes + gpt_volumes:
+        assert v.lookup("/" + v.volume_label + ".TXT").read() == v.volume_label.encode()
+
+
+def test_open_volumes_unpartitioned():
+    [v] = open_volumes(FileReader(BytesIO(volume(16, "SINGLE"))))
+
+    assert (type(v), v.volume_label) == (FAT16Reader, "SINGLE")
+
+
+def test_missing_mbr_signature():
+    with pytest.raises(PartitionException):
+        read_partitions(FileReader(BytesIO(bytes(4 * SECTOR))))
+
+
+@pytest.mark.parametrize("fat", (12, 16, 32))
+def test_fat_type(fat):
+    boot = bytearray(volume(fat, "TYPE")[:SECTOR])
+    assert fat_type(boot) == fat
+
+    # Cluster sizes must be a power of two
+    boot[0x0D] = 3
+
+    with pytest.raises(FATException):
+        fat_type(boot)
+
+
+@pytest.mark.parametrize("sector", (
+    bytes(SECTOR),
+    bytes(mbr((0x06, 2048, 4096))),
+    bytes(SECTOR - 2) + MBR_SIGNATURE,
+))
+def test_fat_type_not_fat(sector):
+    with pytest.raises(FATException):
+        fat_type(sector)
+
+    with pytest.raises(FATException):
+        open_volume(FileReader(BytesIO(sector)))
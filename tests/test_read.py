@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import SEEK_END, BytesIO
+from random import Random
+
+import pytest
+
+from conftest import flatten, set_entry_cluster
+from fat import open_volume
+from fat.fat import FATEntryIO, FATTable, FATEntryNonDirectory, FATEntryNotFound
+from reader import FileReader, MmapReader, PReadReader
+
+
+def test_walk_matches_tree(volume, tree):
+    files = {
+        path.rstrip("/") + "/" + entry.name: entry.read() for path, _, entries in volume.walk() for entry in entries
+    }
+
+    assert files == flatten(tree)
+
+
+@pytest.mark.parametrize("reader_cls", (FileReader, PReadReader))
+def test_walk_prefetch(image_path, reader_cls):
+    # Readers that are not thread safe fall back to reading in place
+    with open(image_path, "rb") as f:
+        volume = open_volume(reader_cls(f))
+        walked = [(path, [e.name for e in dirs], [e.name for e in files]) for path, dirs, files in volume.walk()]
+
+        assert [
+            (path, [e.name for e in dirs], [e.name for e in files])
+            for path, dirs, files in volume.walk(prefetch=4)
+        ] == walked
+
+
+def test_walk_directory_loop(image):
+    # A subdirectory rewritten to its parent's cluster is listed but not entered again
+    _, data = image
+    volume = open_volume(FileReader(BytesIO(data)))
+    parent = next(e for e in volume.scandir("/") if e.is_directory and any(c.is_directory for c in e.scandir()))
+    child = next(c for c in parent.scandir() if c.is_directory)
+    looped = bytearray(data)
+    set_entry_cluster(looped, child, parent.cluster)
+
+    walked = list(open_volume(FileReader(BytesIO(bytes(looped)))).walk())
+    paths = [path for path, _, _ in walked]
+
+    assert len(paths) == len(set(paths))
+    assert "/{}/{}".format(parent.name, child.name) not in paths
+    assert child.name in [d.name for path, dirs, _ in walked if path == "/" + parent.name for d in dirs]
+
+
+def test_extents_cache_is_bounded(image, tree, monkeypatch):
+    # Evicted chains are walked again from the FAT
+    monkeypatch.setattr(FATTable, "EXTENTS_CACHE_SIZE", 4)
+    volume = open_volume(FileReader(BytesIO(image[1])))
+
+    for _ in range(2):
+        files = {
+            path.rstrip("/") + "/" + entry.name: entry.read() for path, _, entries in volume.walk() for entry in entries
+        }
+
+        assert files == flatten(tree)
+        assert volume.primary_fat._extents.used <= 4 or len(volume.primary_fat._extents) == 1
+
+    assert volume.primary_fat._extents.evictions
+
+
+def test_lookup_names(volume, tree):
+    entry = volume.lookup("/Long Name With Spaces.dat")
+
+    assert entry.size == len(tree["Long Name With Spaces.dat"])
+    assert volume.lookup("/" + entry.short_name.lower()).name == entry.name
+
+    with pytest.raises(FATEntryNotFound):
+        volume.lookup("/missing.txt")
+
+
+def test_lookup_below_empty_file(volume):
+    # Empty files have first cluster 0, which must not resolve to the cached root listing
+    assert volume.lookup("/EMPTY.TXT").cluster == 0
+    list(volume.scandir("/"))
+
+    with pytest.raises(FATEntryNonDirectory):
+        volume.lookup("/EMPTY.TXT/A.TXT")
+
+    with pytest.raises(FATEntryNonDirectory):
+        volume.scandir("/EMPTY.TXT")
+
+
+@pytest.mark.parametrize("read_ahead", (0, 4096, FATEntryIO.READ_AHEAD))
+@pytest.mark.parametrize("workers", (0, 2))
+@pytest.mark.parametrize("buffering", (0, 8192))
+def test_stream_reads(image_path, tree, read_ahead, workers, buffering):
+    data, rnd = tree["Long Name With Spaces.dat"], Random(read_ahead + workers)
+
+    with open(image_path, "rb") as f, ThreadPoolExecutor(max(workers, 1)) as executor:
+        entry = open_volume(PReadReader(f)).lookup("/Long Name With Spaces.dat")
+
+        with entry.open(buffering, read_ahead, executor if workers else None) as src:
+            chunks = iter(lambda: src.read(rnd.choice((1, 100, 512, 3000))), b"")
+            assert b"".join(chunks) == data
+
+            for _ in range(20):
+                offset, size = rnd.randrange(len(data)), rnd.randrange(1, 4000)
+                src.seek(offset)
+                assert src.read(size) == data[offset: offset + size]
+
+            assert src.seek(-10, SEEK_END) == len(data) - 10
+            assert src.read() == data[-10:]
+
+        # Options of one stream are not left behind for the next reads of the entry
+        executor.shutdown()
+        assert entry.read() == data
+        assert entry.read(10, 5) == data[5: 15]
+
+        with entry.open() as src:
+            assert b"".join(iter(lambda: src.read(1000), b"")) == data
+
+
+def test_mmap_reader_closes_after_listing(image_path, tree):
+    # Cached entries must not keep views into the mapping
+    with open(image_path, "rb") as f, MmapReader(f) as r:
+        volume = open_volume(r)
+        files = {
+            path.rstrip("/") + "/" + entry.name: entry.read() for path, _, entries in volume.walk() for entry in entries
+        }
+
+        assert all(isinstance(entry.record, bytes) for entry in volume.scandir("/"))
+
+    assert files == flatten(tree)
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from partition import PartitionReader
+from reader import CachingReader, FileReader, InstrumentedReader, MmapReader, PReadReader
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 64)
+    return path
+
+
+@pytest.mark.parametrize("reader_cls", (
+    FileReader, PReadReader, MmapReader, lambda f: CachingReader(FileReader(f), 512, 4096)
+))
+def test_read_and_readinto(data_path, reader_cls):
+    data = data_path.read_bytes()
+
+    with open(data_path, "rb") as f:
+        reader = reader_cls(f)
+        buffer = bytearray(1000)
+
+        assert bytes(reader.read(1000, 300, 100)) == data[400: 1400]
+        assert reader.readinto(buffer, 300, 100) == 1000 and buffer == data[400: 1400]
+        assert bytes(reader.read(100, len(data) - 10)) == data[-10:]
+
+
+def test_pread_reader_without_preadv(data_path, monkeypatch):
+    # Platforms without os.preadv read with os.pread and copy
+    monkeypatch.delattr(os, "preadv", raising=False)
+    data, buffer = data_path.read_bytes(), bytearray(500)
+
+    with open(data_path, "rb") as f:
+        assert PReadReader(f).readinto(buffer, 1000) == 500 and buffer == data[1000: 1500]
+
+
+def test_pread_reader_without_pread(data_path, monkeypatch):
+    monkeypatch.delattr(os, "pread", raising=False)
+
+    with open(data_path, "rb") as f, pytest.raises(NotImplementedError):
+        PReadReader(f)
+
+
+def test_wrappers_forward_reader(data_path):
+    with open(data_path, "rb") as f:
+        for inner in (FileReader(f), PReadReader(f)):
+            for wrapper in (InstrumentedReader(inner), PartitionReader(inner, 512, 1024)):
+                assert wrapper.thread_safe == inner.thread_safe
+                assert wrapper.fs is f
+
+            # The block cache itself is not safe for concurrent use
+            assert CachingReader(inner).thread_safe is False
+            assert PartitionReader(InstrumentedReader(CachingReader(inner)), 0, 512).fs is f
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+from conftest import set_fat
+from fat import open_volume, scan_volume
+from fat.scan import FATDeletedEntry, FATFreeRun
+from reader import FileReader
+
+NAME = "Long Name With Spaces.dat"
+
+
+def delete(fat, data):
+    # Marks the entry and its long name slots deleted and frees its chain, like a FAT driver does
+    volume, deleted = open_volume(FileReader(BytesIO(data))), bytearray(data)
+    entry = volume.lookup("/" + NAME)
+    ptr = deleted.find(entry.record)
+    slots = -(-len(NAME) // 13)
+
+    for slot_ptr in range(ptr - slots * 32, ptr + 32, 32):
+        deleted[slot_ptr] = 0xE5
+
+    for start, length in entry.extents:
+        for cluster in range(start, start + length):
+            set_fat(deleted, fat, volume.boot_sector, cluster, 0)
+
+    return entry, ptr, open_volume(FileReader(BytesIO(bytes(deleted))))
+
+
+def test_deleted_entry(image):
+    entry, ptr, volume = delete(*image)
+    found = [e for e in scan_volume(volume) if isinstance(e, FATDeletedEntry) and e.ptr == ptr]
+
+    assert found == [FATDeletedEntry(
+        ptr, NAME, entry.short_name, False, entry.cluster, entry.size, entry.modified, True
+    )]
+    assert NAME not in [e.name for e in volume.scandir("/")]
+
+
+def test_free_runs(image):
+    _, _, volume = delete(*image)
+    clusters = volume.boot_sector.clusters
+    free = [volume.primary_fat[cluster] == 0 for cluster in range(2, clusters + 2)]
+    runs = []
+
+    for idx, is_free in enumerate(free):
+        if is_free and (not idx or not free[idx - 1]):
+            runs.append(FATFreeRun(idx + 2, 0))
+
+        if is_free:
+            runs[-1] = runs[-1]._replace(count=runs[-1].count + 1)
+
+    assert [e for e in scan_volume(volume, block_size=4096) if isinstance(e, FATFreeRun)] == runs
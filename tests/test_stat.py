@@ -0,0 +1,82 @@
+from collections import Counter
+
+from conftest import adjacent_free
+
+from fat.fat32 import FAT32Reader
+
+
+def brute_force(volume):
+    # Cluster states from one FAT lookup per cluster and fragments from the extents of every chain of the tree
+    clusters = volume.boot_sector.clusters
+    values = [volume.primary_fat[cluster] for cluster in range(2, clusters + 2)]
+    bad = volume.primary_fat._get_bad_cluster()
+    fragments = Counter()
+
+    if isinstance(volume, FAT32Reader):
+        fragments[len(volume.primary_fat.extents(volume.boot_sector.data.RootCluster))] += 1
+
+    for _, dirs, files in volume.walk():
+        fragments.update(len(entry.extents) for entry in dirs + files if entry.cluster)
+
+    return values, values.count(0), values.count(bad), fragments
+
+
+def largest_free_run(values):
+    largest = run = 0
+
+    for value in values:
+        run = run + 1 if value == 0 else 0
+        largest = max(largest, run)
+
+    return largest
+
+
+def test_statvfs(volume):
+    values, free, bad, _ = brute_force(volume)
+    stat = volume.statvfs()
+
+    assert stat.cluster_size == volume.boot_sector.cluster_size
+    assert stat.clusters == len(values)
+    assert (stat.free, stat.bad, stat.used) == (free, bad, len(values) - free - bad)
+    assert stat.largest_free_run == largest_free_run(values)
+
+
+def test_statvfs_bad_clusters(corrupt):
+    def mark_bad(volume):
+        used = volume.primary_fat.runs(volume.boot_sector.clusters).used
+        first = used.find(b"\x00")
+        return [(first + 2, corrupt.bad), (used.find(b"\x00", first + 1) + 2, corrupt.bad)]
+
+    volume = corrupt(mark_bad)
+    values, free, bad, _ = brute_force(volume)
+
+    assert bad == 2
+    assert (volume.statvfs().free, volume.statvfs().bad) == (free, bad)
+
+
+def test_allocation_bitmap(volume):
+    values, _, _, _ = brute_force(volume)
+    bitmap = volume.allocation_bitmap
+
+    assert len(bitmap) == (len(values) + 2 + 7) // 8
+    assert [bitmap[c // 8] >> c % 8 & 1 for c in range(len(values) + 2)] == [1, 1] + [int(v != 0) for v in values]
+
+
+def test_fragmentation(volume):
+    _, _, _, fragments = brute_force(volume)
+    report = volume.fragmentation()
+
+    assert report.histogram == dict(sorted(fragments.items()))
+    assert report.chains == sum(fragments.values())
+    assert report.fragmented == sum(count for n, count in fragments.items() if n > 1)
+    assert report.fragmented > 0
+
+
+def test_fragmentation_with_free_link(corrupt, volume):
+    # A chain linking into the free cluster right after it keeps its fragments
+    _, last = adjacent_free(volume)
+    corrupted = corrupt(lambda v: [(last, last + 1)])
+    _, _, _, fragments = brute_force(corrupted)
+
+    assert corrupted.fragmentation().histogram == dict(sorted(fragments.items()))
+    assert corrupted.fragmentation().chains == volume.fragmentation().chains
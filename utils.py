@@ -1,3 +1,6 @@
+from collections import OrderedDict, deque
+
+
 class groupby:
     def __init__(self, predicate, iterable):
         self.predicate = predicate
@@ -29,5 +32,72 @@ class groupby:
                 return
 
 
-def slice_len(offset, length):
-    return slice(offset, offset + length)
+class LRUCache:
+    def __init__(self, budget, weigh=lambda _: 1):
+        self.budget = budget
+        self.weigh = weigh
+        self.used = 0
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        try:
+            value, _ = self.items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.pop(key)
+
+        weight = self.weigh(value)
+        self.items[key] = (value, weight)
+        self.used += weight
+
+        while self.used > self.budget and len(self.items) > 1:
+            _, (_, evicted) = self.items.popitem(last=False)
+            self.used -= evicted
+            self.evictions += 1
+
+        return value
+
+    def pop(self, key):
+        value, weight = self.items.pop(key, (None, 0))
+        self.used -= weight
+        return value
+
+    def clear(self):
+        self.items.clear()
+        self.used = 0
+
+
+def prefetch_map(func, iterable, pool=None, window=0):
+    # Ordered `(item, func(item))` pairs, keeping up to `window` calls in flight on `pool` ahead of the consumer
+    if pool is None or window <= 0:
+        yield from ((item, func(item)) for item in iterable)
+        return
+
+    pending = deque()
+
+    for item in iterable:
+        pending.append((item, pool.submit(func, item)))
+
+        if len(pending) > window:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()